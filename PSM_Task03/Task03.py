@@ -1,5 +1,8 @@
+import argparse
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from psm_plot import pyplot
 
 # Constants
 g = 9.81        # Gravity (m/s^2)
@@ -59,6 +62,174 @@ def rk4(alpha0, omega0, dt, steps):
 
     return times, alphas, omegas
 
+# Ensemble versions: a whole batch of pendulums is advanced at once.
+# alpha0/omega0 (and optionally g_over_r) are broadcast to a common
+# number of members; the results have shape (members, steps).
+def _ensemble_setup(alpha0, omega0, dt, steps, g_over_r):
+    alpha0 = np.atleast_1d(np.asarray(alpha0, dtype=float))
+    omega0 = np.atleast_1d(np.asarray(omega0, dtype=float))
+    if g_over_r is None:
+        g_over_r = g / r
+    k = np.atleast_1d(np.asarray(g_over_r, dtype=float))
+    alpha0, omega0, k = np.broadcast_arrays(alpha0, omega0, k)
+
+    members = alpha0.shape[0]
+    alphas = np.zeros((members, steps))
+    omegas = np.zeros((members, steps))
+    times = np.linspace(0, steps * dt, steps)
+    alphas[:, 0] = alpha0
+    omegas[:, 0] = omega0
+    return times, alphas, omegas, k.copy()
+
+def improved_euler_ensemble(alpha0, omega0, dt, steps, g_over_r=None):
+    times, alphas, omegas, k = _ensemble_setup(alpha0, omega0, dt, steps, g_over_r)
+
+    for i in range(steps - 1):
+        a = alphas[:, i]
+        w = omegas[:, i]
+        da1 = w
+        dw1 = -k * np.sin(a)
+        a_temp = a + da1 * dt
+        w_temp = w + dw1 * dt
+        da2 = w_temp
+        dw2 = -k * np.sin(a_temp)
+        alphas[:, i + 1] = a + (dt / 2) * (da1 + da2)
+        omegas[:, i + 1] = w + (dt / 2) * (dw1 + dw2)
+
+    return times, alphas, omegas
+
+def rk4_ensemble(alpha0, omega0, dt, steps, g_over_r=None):
+    times, alphas, omegas, k = _ensemble_setup(alpha0, omega0, dt, steps, g_over_r)
+
+    for i in range(steps - 1):
+        a = alphas[:, i]
+        w = omegas[:, i]
+        k1_a = w
+        k1_w = -k * np.sin(a)
+        k2_a = w + 0.5 * dt * k1_w
+        k2_w = -k * np.sin(a + 0.5 * dt * k1_a)
+        k3_a = w + 0.5 * dt * k2_w
+        k3_w = -k * np.sin(a + 0.5 * dt * k2_a)
+        k4_a = w + dt * k3_w
+        k4_w = -k * np.sin(a + dt * k3_a)
+        alphas[:, i + 1] = a + (dt / 6) * (k1_a + 2 * k2_a + 2 * k3_a + k4_a)
+        omegas[:, i + 1] = w + (dt / 6) * (k1_w + 2 * k2_w + 2 * k3_w + k4_w)
+
+    return times, alphas, omegas
+
+# Adaptive Dormand-Prince 5(4) method
+# Butcher tableau; the last row holds the 5th order weights, so the 7th
+# stage is the RHS at the new point and is reused as the next first stage
+DP_A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+    [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84],
+]
+# Difference between the 5th and the embedded 4th order weights
+DP_E = np.array([71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40])
+# Coefficients of the continuous extension (dense output)
+DP_D = np.array([-12715105075/11282082432, 0, 87487479700/32700410799,
+                 -10690763975/1880347072, 701980252875/199316789632,
+                 -1453857185/822651844, 69997945/29380423])
+
+def pendulum_rhs(state):
+    return np.array([state[1], -(g / r) * np.sin(state[0])])
+
+def dopri54(alpha0, omega0, t_end, rtol=1e-6, atol=1e-9, t_eval=None, h0=None, max_steps=100000):
+    """Integrate the pendulum with an adaptive Dormand-Prince 5(4) pair.
+
+    Without t_eval the accepted step points are returned; otherwise the
+    solution is sampled on t_eval (sorted, inside [0, t_end]) with the
+    4th order dense output.
+    Returns times, alphas, omegas and the number of RHS evaluations.
+    """
+    if t_eval is not None:
+        t_eval = np.asarray(t_eval, dtype=float)
+        # Points out of order or outside [0, t_end] would never be reached by the step loop
+        if t_eval.ndim != 1 or not (np.all(np.diff(t_eval) >= 0) and np.all((t_eval >= 0) & (t_eval <= t_end))):
+            raise ValueError(f"t_eval must be a sorted 1D array inside [0, {t_end}]")
+
+    y = np.array([alpha0, omega0], dtype=float)
+    t = 0.0
+    k = np.zeros((7, 2))
+    k[0] = pendulum_rhs(y)
+    nfev = 1
+
+    if h0 is None:
+        # Rough first guess from the size of the solution and its derivative
+        scale = atol + rtol * np.abs(y)
+        d0 = np.sqrt(np.mean((y / scale) ** 2))
+        d1 = np.sqrt(np.mean((k[0] / scale) ** 2))
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+    h = min(h0, t_end)
+
+    if t_eval is None:
+        out_t, out_y = [t], [y.copy()]
+    else:
+        samples = np.zeros((len(t_eval), 2))
+        j = 0
+        # Points at the start are simply the initial state
+        while j < len(t_eval) and t_eval[j] <= t:
+            samples[j] = y
+            j += 1
+
+    n_steps = 0
+    while t < t_end:
+        if n_steps >= max_steps:
+            raise RuntimeError(f"dopri54 did not reach t_end={t_end} in {max_steps} steps")
+        n_steps += 1
+        last = h >= t_end - t
+        if last:
+            h = t_end - t
+
+        for s in range(1, 7):
+            y_stage = y + h * np.dot(DP_A[s], k[:s])
+            k[s] = pendulum_rhs(y_stage)
+        nfev += 6
+        y_new = y + h * np.dot(DP_A[6], k[:6])
+
+        # Error estimate and step size control
+        err_vec = h * np.dot(DP_E, k)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err = np.sqrt(np.mean((err_vec / scale) ** 2))
+        factor = 10.0 if err == 0 else min(10.0, max(0.2, 0.9 * err ** -0.2))
+
+        if err > 1:
+            # Rejected: retry the same step with a smaller h
+            h *= min(1.0, factor)
+            continue
+
+        t_new = t_end if last else t + h
+        if t_eval is not None and j < len(t_eval) and t_eval[j] <= t_new:
+            # Dense output polynomial on [t, t_new]
+            r1 = y
+            r2 = y_new - y
+            r3 = h * k[0] - r2
+            r4 = r2 - h * k[6] - r3
+            r5 = h * np.dot(DP_D, k)
+            while j < len(t_eval) and t_eval[j] <= t_new:
+                theta = (t_eval[j] - t) / h
+                theta1 = 1 - theta
+                samples[j] = r1 + theta * (r2 + theta1 * (r3 + theta * (r4 + theta1 * r5)))
+                j += 1
+
+        t = t_new
+        y = y_new
+        k[0] = k[6]
+        h *= factor
+        if t_eval is None:
+            out_t.append(t)
+            out_y.append(y.copy())
+
+    if t_eval is None:
+        out_y = np.array(out_y)
+        return np.array(out_t), out_y[:, 0], out_y[:, 1], nfev
+    return t_eval, samples[:, 0], samples[:, 1], nfev
+
 # Energy Calculation
 def compute_energies(alphas, omegas):
     pe = m * g * r * (1 - np.cos(alphas))
@@ -67,53 +238,84 @@ def compute_energies(alphas, omegas):
     return pe, ke, total
 
 # Run simulations
-t_euler, alpha_euler, omega_euler = improved_euler(alpha0, omega0, dt, steps)
-t_rk4, alpha_rk4, omega_rk4 = rk4(alpha0, omega0, dt, steps)
+def run_simulation():
+    t_euler, alpha_euler, omega_euler = improved_euler(alpha0, omega0, dt, steps)
+    t_rk4, alpha_rk4, omega_rk4 = rk4(alpha0, omega0, dt, steps)
+
+    # Compute energies
+    pe_euler, ke_euler, total_euler = compute_energies(alpha_euler, omega_euler)
+    pe_rk4, ke_rk4, total_rk4 = compute_energies(alpha_rk4, omega_rk4)
 
-# Compute energies
-pe_euler, ke_euler, total_euler = compute_energies(alpha_euler, omega_euler)
-pe_rk4, ke_rk4, total_rk4 = compute_energies(alpha_rk4, omega_rk4)
+    return {
+        "euler": {"t": t_euler, "alpha": alpha_euler, "omega": omega_euler,
+                  "pe": pe_euler, "ke": ke_euler, "total": total_euler},
+        "rk4": {"t": t_rk4, "alpha": alpha_rk4, "omega": omega_rk4,
+                "pe": pe_rk4, "ke": ke_rk4, "total": total_rk4},
+    }
 
 # Plotting
-plt.figure(figsize=(14, 8))
-
-# Angular displacement
-plt.subplot(2, 2, 1)
-plt.plot(t_euler, alpha_euler, label='Improved Euler')
-plt.plot(t_rk4, alpha_rk4, label='RK4', linestyle='--')
-plt.title("Angular Displacement vs Time")
-plt.xlabel("Time (s)")
-plt.ylabel("Angle (rad)")
-plt.legend()
-
-# Total energy comparison
-plt.subplot(2, 2, 2)
-plt.plot(t_euler, total_euler, label='Improved Euler')
-plt.plot(t_rk4, total_rk4, label='RK4', linestyle='--')
-plt.title("Total Energy vs Time")
-plt.xlabel("Time (s)")
-plt.ylabel("Energy")
-plt.legend()
-
-# Energy components - Improved Euler
-plt.subplot(2, 2, 3)
-plt.plot(t_euler, pe_euler, label='Potential Energy')
-plt.plot(t_euler, ke_euler, label='Kinetic Energy')
-plt.plot(t_euler, total_euler, label='Total Energy', linestyle='--')
-plt.title("Energy Components (Improved Euler)")
-plt.xlabel("Time (s)")
-plt.ylabel("Energy")
-plt.legend()
-
-# Energy components - RK4
-plt.subplot(2, 2, 4)
-plt.plot(t_rk4, pe_rk4, label='Potential Energy')
-plt.plot(t_rk4, ke_rk4, label='Kinetic Energy')
-plt.plot(t_rk4, total_rk4, label='Total Energy', linestyle='--')
-plt.title("Energy Components (RK4)")
-plt.xlabel("Time (s)")
-plt.ylabel("Energy")
-plt.legend()
-
-plt.tight_layout()
-plt.show()
+def plot_results(results, save=None):
+    plt = pyplot(save)
+    euler = results["euler"]
+    rk = results["rk4"]
+
+    plt.figure(figsize=(14, 8))
+
+    # Angular displacement
+    plt.subplot(2, 2, 1)
+    plt.plot(euler["t"], euler["alpha"], label='Improved Euler')
+    plt.plot(rk["t"], rk["alpha"], label='RK4', linestyle='--')
+    plt.title("Angular Displacement vs Time")
+    plt.xlabel("Time (s)")
+    plt.ylabel("Angle (rad)")
+    plt.legend()
+
+    # Total energy comparison
+    plt.subplot(2, 2, 2)
+    plt.plot(euler["t"], euler["total"], label='Improved Euler')
+    plt.plot(rk["t"], rk["total"], label='RK4', linestyle='--')
+    plt.title("Total Energy vs Time")
+    plt.xlabel("Time (s)")
+    plt.ylabel("Energy")
+    plt.legend()
+
+    # Energy components - Improved Euler
+    plt.subplot(2, 2, 3)
+    plt.plot(euler["t"], euler["pe"], label='Potential Energy')
+    plt.plot(euler["t"], euler["ke"], label='Kinetic Energy')
+    plt.plot(euler["t"], euler["total"], label='Total Energy', linestyle='--')
+    plt.title("Energy Components (Improved Euler)")
+    plt.xlabel("Time (s)")
+    plt.ylabel("Energy")
+    plt.legend()
+
+    # Energy components - RK4
+    plt.subplot(2, 2, 4)
+    plt.plot(rk["t"], rk["pe"], label='Potential Energy')
+    plt.plot(rk["t"], rk["ke"], label='Kinetic Energy')
+    plt.plot(rk["t"], rk["total"], label='Total Energy', linestyle='--')
+    plt.title("Energy Components (RK4)")
+    plt.xlabel("Time (s)")
+    plt.ylabel("Energy")
+    plt.legend()
+
+    plt.tight_layout()
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pendulum simulation (Improved Euler and RK4).")
+    parser.add_argument("--no-plot", action="store_true", help="only run the simulation, do not render anything")
+    parser.add_argument("--save", metavar="PATH", help="write the figure to PATH instead of opening a window")
+    args = parser.parse_args(argv)
+
+    results = run_simulation()
+    if not args.no_plot:
+        plot_results(results, save=args.save)
+    return results
+
+if __name__ == "__main__":
+    main()
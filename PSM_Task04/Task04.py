@@ -1,5 +1,9 @@
+import argparse
+import os
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from psm_plot import pyplot
 
 # Constants
 g = 9.81  # gravitational acceleration (m/s^2)
@@ -26,8 +30,8 @@ T = 2.0    # total simulation time (s)
 N = int(T / dt)
 time = np.linspace(0, T, N)
 
-# Midpoint method simulation function with energy
-def simulate_rolling_object_with_energy(mass, radius, inertia_factor):
+# Midpoint method simulation function with energy (step-by-step reference)
+def simulate_rolling_object_midpoint(mass, radius, inertia_factor):
     I = inertia_factor * mass * radius**2
     a = (g * np.sin(alpha)) / (1 + (I / (mass * radius**2)))
 
@@ -65,51 +69,141 @@ def simulate_rolling_object_with_energy(mass, radius, inertia_factor):
 
     return s, v, beta, omega, PE, KE, E_total
 
+def _as_column(value):
+    # Array parameters describe many bodies: one row per body, one column per time sample
+    value = np.asarray(value, dtype=float)
+    return value[..., np.newaxis] if value.ndim else value
+
+# Closed-form solution. The acceleration is constant, so s = a t^2 / 2 and
+# v = a t; rolling without slipping gives beta = s / R and omega = v / R.
+# mass, radius, inertia_factor and incline (radians) may be arrays (one
+# entry per body), in which case every result has shape (bodies, len(t)).
+def simulate_rolling_object_closed_form(mass, radius, inertia_factor, t=None, incline=alpha):
+    if t is None:
+        t = np.arange(N) * dt
+    mass = _as_column(mass)
+    radius = _as_column(radius)
+    inertia_factor = _as_column(inertia_factor)
+    sin_incline = np.sin(_as_column(incline))
+    t = np.asarray(t, dtype=float)
+
+    I = inertia_factor * mass * radius**2
+    a = (g * sin_incline) / (1 + inertia_factor)
+
+    v = a * t
+    s = 0.5 * v * t
+    omega = v / radius
+    beta = s / radius
+
+    PE = (mass * g * sin_incline) * s
+    KE = 0.5 * mass * v**2 + 0.5 * I * omega**2
+    E_total = PE + KE
+
+    return s, v, beta, omega, PE, KE, E_total
+
+def simulate_rolling_object_with_energy(mass, radius, inertia_factor, method="closed_form"):
+    if method == "closed_form":
+        return simulate_rolling_object_closed_form(mass, radius, inertia_factor)
+    if method == "midpoint":
+        return simulate_rolling_object_midpoint(mass, radius, inertia_factor)
+    raise ValueError(f"Unknown method {method!r}, expected 'closed_form' or 'midpoint'")
+
+# Largest relative difference between the closed-form and the midpoint
+# results over all seven arrays. The midpoint method integrates constant
+# acceleration exactly, so only rounding errors should show up here.
+def check_consistency(mass, radius, inertia_factor):
+    exact = simulate_rolling_object_closed_form(mass, radius, inertia_factor)
+    stepped = simulate_rolling_object_midpoint(mass, radius, inertia_factor)
+    worst = 0.0
+    for e, m in zip(exact, stepped):
+        scale = max(np.max(np.abs(e)), np.finfo(float).tiny)
+        worst = max(worst, np.max(np.abs(e - m)) / scale)
+    return worst
+
 # Running simulations
-results = {}
-for name, props in objects.items():
-    s, v, beta, omega, PE, KE, E = simulate_rolling_object_with_energy(
-        props["mass"], props["radius"], props["inertia_factor"]
-    )
-    results[name] = {
-        "s": s, "v": v, "beta": beta, "omega": omega,
-        "PE": PE, "KE": KE, "E": E
-    }
+def run_simulation(objects=objects, method="closed_form"):
+    results = {}
+    for name, props in objects.items():
+        s, v, beta, omega, PE, KE, E = simulate_rolling_object_with_energy(
+            props["mass"], props["radius"], props["inertia_factor"], method
+        )
+        results[name] = {
+            "s": s, "v": v, "beta": beta, "omega": omega,
+            "PE": PE, "KE": KE, "E": E
+        }
+    return results
+
+def _finish_figure(plt, save, name):
+    # With --save every figure goes to its own file: out.png -> out_<name>.png
+    if save:
+        root, ext = os.path.splitext(save)
+        plt.savefig(f"{root}_{name}{ext or '.png'}")
+        plt.close()
+    else:
+        plt.show()
+
+def plot_results(results, save=None):
+    plt = pyplot(save)
+
+    # Plot center of mass position
+    plt.figure(figsize=(10, 4))
+    for name in results:
+        plt.plot(time, results[name]["s"], label=f'{name} position')
+    plt.title("Center of Mass Position vs Time")
+    plt.xlabel("Time (s)")
+    plt.ylabel("Position (m)")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    _finish_figure(plt, save, "position")
 
-# Plot center of mass position
-plt.figure(figsize=(10, 4))
-for name in results:
-    plt.plot(time, results[name]["s"], label=f'{name} position')
-plt.title("Center of Mass Position vs Time")
-plt.xlabel("Time (s)")
-plt.ylabel("Position (m)")
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.show()
-
-# Plot rotation angle
-plt.figure(figsize=(10, 4))
-for name in results:
-    plt.plot(time, results[name]["beta"], label=f'{name} rotation angle')
-plt.title("Rotation Angle vs Time")
-plt.xlabel("Time (s)")
-plt.ylabel("Rotation Angle (rad)")
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.show()
-
-# Plot energy graphs
-for name in results:
-    plt.figure(figsize=(10, 5))
-    plt.plot(time, results[name]["PE"], label="Potential Energy")
-    plt.plot(time, results[name]["KE"], label="Kinetic Energy")
-    plt.plot(time, results[name]["E"], label="Total Energy", linestyle='--')
-    plt.title(f"Energy vs Time for {name}")
+    # Plot rotation angle
+    plt.figure(figsize=(10, 4))
+    for name in results:
+        plt.plot(time, results[name]["beta"], label=f'{name} rotation angle')
+    plt.title("Rotation Angle vs Time")
     plt.xlabel("Time (s)")
-    plt.ylabel("Energy (J)")
+    plt.ylabel("Rotation Angle (rad)")
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
-    plt.show()
+    _finish_figure(plt, save, "rotation")
+
+    # Plot energy graphs
+    for name in results:
+        plt.figure(figsize=(10, 5))
+        plt.plot(time, results[name]["PE"], label="Potential Energy")
+        plt.plot(time, results[name]["KE"], label="Kinetic Energy")
+        plt.plot(time, results[name]["E"], label="Total Energy", linestyle='--')
+        plt.title(f"Energy vs Time for {name}")
+        plt.xlabel("Time (s)")
+        plt.ylabel("Energy (J)")
+        plt.legend()
+        plt.grid(True)
+        plt.tight_layout()
+        _finish_figure(plt, save, f"energy_{name}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sphere and disk rolling down an incline (closed form or Midpoint method, see --method).")
+    parser.add_argument("--no-plot", action="store_true", help="only run the simulation, do not render anything")
+    parser.add_argument("--save", metavar="PATH",
+                        help="write the figures to files derived from PATH instead of opening windows")
+    parser.add_argument("--method", choices=["closed_form", "midpoint"], default="closed_form",
+                        help="closed-form (vectorized) engine or the step-by-step midpoint reference")
+    parser.add_argument("--check", action="store_true",
+                        help="compare both engines for every object and print the largest relative difference")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        for name, props in objects.items():
+            diff = check_consistency(props["mass"], props["radius"], props["inertia_factor"])
+            print(f"{name}: max relative difference closed_form vs midpoint = {diff:.2e}")
+
+    results = run_simulation(method=args.method)
+    if not args.no_plot:
+        plot_results(results, save=args.save)
+    return results
+
+if __name__ == "__main__":
+    main()
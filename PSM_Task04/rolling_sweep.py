@@ -0,0 +1,157 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from Task04 import T, g, simulate_rolling_object_closed_form
+
+# Inertia factors k in I = k * m * R^2 for the built-in bodies.
+# Any other body can be added by name, e.g. --body cone=0.3
+BODIES = {
+    "sphere": 2/5,
+    "disk": 1/2,
+    "hoop": 1.0,
+    "hollow_sphere": 2/3,
+}
+
+# Input columns identify a grid point, the rest are the state at t_end
+INPUT_FIELDS = ["body", "incline_deg", "mass", "radius", "inertia_factor"]
+SWEEP_DTYPE = np.dtype([
+    ("body", "U32"),
+    ("incline_deg", float),
+    ("mass", float),
+    ("radius", float),
+    ("inertia_factor", float),
+    ("acceleration", float),
+    ("s", float),
+    ("v", float),
+    ("beta", float),
+    ("omega", float),
+    ("PE", float),
+    ("KE", float),
+    ("E", float),
+])
+
+def build_grid(incline_deg, masses, radii, bodies=BODIES):
+    # Cartesian product of all parameters, one row per configuration
+    names = list(bodies)
+    factors = np.array([bodies[name] for name in names], dtype=float)
+    ia, im, ir, ib = np.meshgrid(
+        np.arange(len(incline_deg)), np.arange(len(masses)),
+        np.arange(len(radii)), np.arange(len(names)), indexing="ij"
+    )
+    grid = np.zeros(ia.size, dtype=SWEEP_DTYPE)
+    grid["incline_deg"] = np.asarray(incline_deg, dtype=float)[ia.ravel()]
+    grid["mass"] = np.asarray(masses, dtype=float)[im.ravel()]
+    grid["radius"] = np.asarray(radii, dtype=float)[ir.ravel()]
+    grid["body"] = np.array(names)[ib.ravel()]
+    grid["inertia_factor"] = factors[ib.ravel()]
+    return grid
+
+def evaluate(points, t_end=T):
+    # Fill in the outputs of a block of grid points in one vectorized call
+    results = points.copy()
+    incline = np.radians(points["incline_deg"])
+    s, v, beta, omega, PE, KE, E = simulate_rolling_object_closed_form(
+        points["mass"], points["radius"], points["inertia_factor"],
+        t=np.array([t_end]), incline=incline
+    )
+    results["acceleration"] = g * np.sin(incline) / (1 + points["inertia_factor"])
+    for field, values in zip(["s", "v", "beta", "omega", "PE", "KE", "E"], [s, v, beta, omega, PE, KE, E]):
+        results[field] = values[:, 0]
+    return results
+
+def _keys(points):
+    return zip(*(points[field].tolist() for field in INPUT_FIELDS))
+
+def load_results(path):
+    # Columnar .npz file: one array per field of SWEEP_DTYPE, plus the t_end of the run
+    # (None for files written before it was stored)
+    with np.load(path) as data:
+        results = np.zeros(len(data["body"]), dtype=SWEEP_DTYPE)
+        for field in SWEEP_DTYPE.names:
+            results[field] = data[field]
+        t_end = float(data["t_end"]) if "t_end" in data.files else None
+    return results, t_end
+
+def save_results(path, results, t_end):
+    # Written to a temporary file first so an interrupted run never leaves a broken file
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, t_end=t_end, **{field: results[field] for field in SWEEP_DTYPE.names})
+    os.replace(tmp, path)
+
+def run_sweep(grid, path=None, workers=None, chunk_size=5000, t_end=T):
+    """Evaluate every grid point and return the results as a structured array.
+
+    With a path, results are stored there after every finished chunk and
+    points already present in the file are skipped, so an interrupted
+    sweep continues where it stopped. A file written for another t_end is
+    refused. workers=1 evaluates in-process.
+    """
+    done = np.zeros(0, dtype=SWEEP_DTYPE)
+    if path is not None and os.path.exists(path):
+        done, stored_t_end = load_results(path)
+        if stored_t_end != float(t_end):
+            raise ValueError(f"{path} holds results for t_end={stored_t_end}, not {t_end}; "
+                             f"use another output file")
+        finished = set(_keys(done))
+        todo = np.array([key not in finished for key in _keys(grid)], dtype=bool)
+        grid = grid[todo]
+
+    chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+    parts = [done]
+
+    def collect(part):
+        parts.append(part)
+        if path is not None:
+            save_results(path, np.concatenate(parts), t_end)
+
+    if workers == 1:
+        for chunk in chunks:
+            collect(evaluate(chunk, t_end))
+    elif chunks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(evaluate, chunk, t_end) for chunk in chunks]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    return np.concatenate(parts)
+
+def _float_list(text):
+    # "10,20,30" or an inclusive range "start:stop:count"
+    if ":" in text:
+        start, stop, count = text.split(":")
+        return np.linspace(float(start), float(stop), int(count))
+    return np.array([float(value) for value in text.split(",")])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep incline angles and rolling bodies.")
+    parser.add_argument("--angles", type=_float_list, default=np.array([30.0]),
+                        help="incline angles in degrees, '10,20,30' or 'start:stop:count'")
+    parser.add_argument("--masses", type=_float_list, default=np.array([1.0]), help="masses in kg")
+    parser.add_argument("--radii", type=_float_list, default=np.array([0.1]), help="radii in m")
+    parser.add_argument("--body", action="append", default=[], metavar="NAME=FACTOR",
+                        help="extra body with inertia factor I / (m R^2); can be repeated")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="restrict the sweep to these bodies")
+    parser.add_argument("--t-end", type=float, default=T, help="time at which the state is recorded (s)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="grid points per task")
+    parser.add_argument("--output", default="rolling_sweep.npz", help="columnar results file (.npz)")
+    args = parser.parse_args(argv)
+
+    bodies = dict(BODIES)
+    for item in args.body:
+        name, factor = item.split("=")
+        bodies[name] = float(factor)
+    if args.only:
+        bodies = {name: bodies[name] for name in args.only}
+
+    grid = build_grid(args.angles, args.masses, args.radii, bodies)
+    results = run_sweep(grid, args.output, args.workers, args.chunk_size, args.t_end)
+    print(f"{len(results)} configurations stored in {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
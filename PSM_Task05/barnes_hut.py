@@ -0,0 +1,279 @@
+import argparse
+import time
+
+import numpy as np
+
+from psmtask5 import accelerations as direct_accelerations
+
+# Barnes-Hut force evaluation for the Task05 N-body core.
+#
+# The tree (quadtree in 2D, octree in 3D) and the traversal are both built
+# from whole-array operations: the tree is split one level at a time for all
+# nodes at once, and the walk keeps a list of (leaf, node) pairs that is
+# refined level by level. Leaves are processed in chunks so the pair lists
+# stay bounded in memory.
+
+
+# Tree construction
+def build_tree(pos, masses, leaf_size=16, max_depth=48):
+    """Build a 2^dim-ary tree over pos and return it as a dict of node arrays.
+
+    Particles are reordered (tree["order"]) so that every node owns the
+    contiguous slice order[start:start + count].
+    """
+    n, dim = pos.shape
+    n_children = 2 ** dim
+    lo = pos.min(axis=0)
+    hi = pos.max(axis=0)
+    half0 = max(np.max(hi - lo) / 2, np.finfo(float).tiny) * (1 + 1e-9)
+
+    centers = [((lo + hi) / 2)[np.newaxis]]
+    halves = [np.array([half0])]
+    starts = [np.array([0])]
+    counts = [np.array([n])]
+    child_links = []  # (parent ids, octant codes, child ids) per level
+
+    order = np.arange(n)
+    owner = np.zeros(n, dtype=np.int64)  # deepest node owning each slot of order
+    n_nodes = 1
+    level_first = 0  # id of the first node on the current level
+    bits = 1 << np.arange(dim)
+
+    for depth in range(max_depth):
+        level_count = counts[-1]
+        split = np.flatnonzero(level_count > leaf_size) + level_first
+        if split.size == 0:
+            break
+
+        # Slots of order that belong to a node being split on this level
+        slot_split = np.zeros(n_nodes, dtype=bool)
+        slot_split[split] = True
+        slots = np.flatnonzero(slot_split[owner])
+        node = owner[slots]
+        particles = order[slots]
+
+        all_centers = np.concatenate(centers)
+        all_halves = np.concatenate(halves)
+        code = (pos[particles] >= all_centers[node]) @ bits
+
+        # Group the particles of every split node by octant; the slots of one
+        # node are contiguous, so sorting by (node, code) stays inside it
+        perm = np.lexsort((code, node))
+        order[slots] = particles[perm]
+        node = node[perm]
+        code = code[perm]
+
+        key = node * n_children + code
+        first = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        child_count = np.diff(np.r_[first, key.size])
+        parent = node[first]
+        child_code = code[first]
+        child_ids = n_nodes + np.arange(first.size)
+
+        parent_half = all_halves[parent]
+        signs = np.where((child_code[:, np.newaxis] & bits) != 0, 1.0, -1.0)
+        centers.append(all_centers[parent] + signs * (parent_half / 2)[:, np.newaxis])
+        halves.append(parent_half / 2)
+        starts.append(slots[first])
+        counts.append(child_count)
+        child_links.append((parent, child_code, child_ids))
+
+        owner[slots] = np.repeat(child_ids, child_count)
+        level_first = n_nodes
+        n_nodes += first.size
+
+    children = np.full((n_nodes, n_children), -1, dtype=np.int64)
+    for parent, child_code, child_ids in child_links:
+        children[parent, child_code] = child_ids
+
+    start = np.concatenate(starts)
+    count = np.concatenate(counts)
+
+    # Node mass and centre of mass from prefix sums over the reordered particles
+    m_sorted = masses[order]
+    cum_m = np.r_[0.0, np.cumsum(m_sorted)]
+    cum_mx = np.vstack([np.zeros(dim), np.cumsum(m_sorted[:, np.newaxis] * pos[order], axis=0)])
+    node_mass = cum_m[start + count] - cum_m[start]
+    node_com = (cum_mx[start + count] - cum_mx[start]) / node_mass[:, np.newaxis]
+
+    return {
+        "center": np.concatenate(centers),
+        "half": np.concatenate(halves),
+        "start": start,
+        "count": count,
+        "children": children,
+        "is_leaf": np.all(children < 0, axis=1),
+        "mass": node_mass,
+        "com": node_com,
+        "order": order,
+    }
+
+
+# Tree walk
+def _accumulate(acc, index, vectors, weights):
+    # acc[index] += weights * vectors, with repeated indices summed
+    for d in range(acc.shape[1]):
+        acc[:, d] += np.bincount(index, weights=weights * vectors[:, d], minlength=acc.shape[0])
+
+
+def _expand(groups, count):
+    # For every entry of groups, the offsets 0..count-1 of its members
+    k = count[groups]
+    offsets = np.arange(k.sum()) - np.repeat(np.cumsum(k) - k, k)
+    return np.repeat(np.arange(len(groups)), k), offsets
+
+
+def tree_accelerations(tree, pos, masses, G, theta=0.5, softening=0.0, chunk=2048):
+    """Accelerations of all particles from a built tree.
+
+    The walk is done per leaf ("group") rather than per particle: a node is
+    accepted for the whole leaf when it is well separated from the leaf's
+    bounding box, i.e. the usual opening criterion applied conservatively.
+    """
+    eps2 = softening ** 2
+    theta2 = theta ** 2
+    center, half, com, node_mass = tree["center"], tree["half"], tree["com"], tree["mass"]
+    children, is_leaf = tree["children"], tree["is_leaf"]
+    start, count, order = tree["start"], tree["count"], tree["order"]
+    n_children = children.shape[1]
+
+    # Tight bounding box of every leaf
+    leaves = np.flatnonzero(is_leaf)
+    leaves = leaves[np.argsort(start[leaves])]
+    sorted_pos = pos[order]
+    box_lo = np.minimum.reduceat(sorted_pos, start[leaves], axis=0)
+    box_hi = np.maximum.reduceat(sorted_pos, start[leaves], axis=0)
+    box_center = (box_lo + box_hi) / 2
+    box_half = (box_hi - box_lo) / 2
+
+    acc_sorted = np.zeros_like(pos)
+    for g0 in range(0, len(leaves), chunk):
+        group_leaf = leaves[g0:g0 + chunk]
+        first = start[group_leaf[0]]
+        last = start[group_leaf[-1]] + count[group_leaf[-1]]
+        acc = acc_sorted[first:last]  # particles of this chunk of leaves
+        g = np.arange(len(group_leaf))  # group of each (group, node) pair
+        node = np.zeros(len(group_leaf), dtype=np.int64)
+
+        while g.size:
+            gb = g0 + g
+            gap = np.maximum(np.abs(com[node] - box_center[gb]) - box_half[gb], 0.0)
+            d_min2 = np.einsum('ij,ij->i', gap, gap)
+            overlap = np.all(np.abs(center[node] - box_center[gb]) <= half[node][:, np.newaxis] + box_half[gb], axis=1)
+            far = ~overlap & ((2 * half[node]) ** 2 < theta2 * d_min2)
+
+            # Well separated nodes act on every particle of the group as a
+            # single mass at their centre of mass
+            if far.any():
+                pair, offset = _expand(g[far], count[group_leaf])
+                slot = start[group_leaf[g[far]]][pair] + offset
+                far_node = node[far][pair]
+                d = com[far_node] - sorted_pos[slot]
+                r2 = np.einsum('ij,ij->i', d, d) + eps2
+                _accumulate(acc, slot - first, d, G * node_mass[far_node] / (r2 * np.sqrt(r2)))
+
+            # Nearby leaves: every particle of the group with every particle of the leaf
+            near_leaf = ~far & is_leaf[node]
+            if near_leaf.any():
+                gl = group_leaf[g[near_leaf]]
+                nl = node[near_leaf]
+                pair, offset = _expand(np.arange(len(gl)), count[gl])
+                slot = start[gl][pair] + offset
+                source_leaf = nl[pair]
+                pair2, offset2 = _expand(source_leaf, count)
+                slot_t = slot[pair2]
+                slot_s = start[source_leaf][pair2] + offset2
+                keep = slot_t != slot_s
+                slot_t, slot_s = slot_t[keep], slot_s[keep]
+                d = sorted_pos[slot_s] - sorted_pos[slot_t]
+                r2 = np.einsum('ij,ij->i', d, d) + eps2
+                _accumulate(acc, slot_t - first, d, G * masses[order[slot_s]] / (r2 * np.sqrt(r2)))
+
+            # Everything else is opened and its children are visited next
+            opened = ~far & ~is_leaf[node]
+            kids = children[node[opened]].ravel()
+            valid = kids >= 0
+            g = np.repeat(g[opened], n_children)[valid]
+            node = kids[valid]
+
+    result = np.empty_like(pos)
+    result[order] = acc_sorted
+    return result
+
+
+def accelerations(pos, masses, G, theta=0.5, softening=0.0, leaf_size=16):
+    """Barnes-Hut approximation of the Task05 accelerations() for all bodies."""
+    tree = build_tree(pos, masses, leaf_size)
+    return tree_accelerations(tree, pos, masses, G, theta, softening)
+
+
+# Accuracy vs speed
+def plummer_sphere(n, dim=3, seed=0):
+    # Unit-mass cluster with a Plummer density profile, a typical test case
+    rng = np.random.default_rng(seed)
+    radius = 1 / np.sqrt(rng.uniform(1e-3, 1, n) ** (-2 / 3) - 1)
+    direction = rng.normal(size=(n, dim))
+    direction /= np.linalg.norm(direction, axis=1)[:, np.newaxis]
+    return radius[:, np.newaxis] * direction, np.full(n, 1 / n)
+
+
+def accuracy_report(pos, masses, G=1.0, thetas=(0.3, 0.5, 0.7, 1.0), softening=0.0, sample=1000, seed=0,
+                    leaf_size=16):
+    """Compare Barnes-Hut with direct summation for several opening angles.
+
+    The direct sum is evaluated on a random sample of targets and its
+    full-N time is extrapolated from that. Returns one row per theta with
+    the timings and the relative acceleration errors on the sample.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(pos)
+    sample_ids = rng.choice(n, size=min(sample, n), replace=False)
+
+    t0 = time.perf_counter()
+    reference = direct_accelerations(pos, masses, softening, G=G, targets=sample_ids)
+    direct_time = (time.perf_counter() - t0) * n / len(sample_ids)
+    ref_norm = np.linalg.norm(reference, axis=1)
+
+    rows = []
+    for theta in thetas:
+        t0 = time.perf_counter()
+        tree = build_tree(pos, masses, leaf_size)
+        build_time = time.perf_counter() - t0
+        acc = tree_accelerations(tree, pos, masses, G, theta, softening)
+        total_time = time.perf_counter() - t0
+        err = np.linalg.norm(acc[sample_ids] - reference, axis=1) / ref_norm
+        rows.append({
+            "theta": theta,
+            "build_s": build_time,
+            "total_s": total_time,
+            "direct_s": direct_time,
+            "speedup": direct_time / total_time,
+            "median_err": np.median(err),
+            "p99_err": np.percentile(err, 99),
+            "max_err": err.max(),
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barnes-Hut accuracy vs speed against direct summation.")
+    parser.add_argument("--n", type=int, default=100000, help="number of particles")
+    parser.add_argument("--dim", type=int, choices=[2, 3], default=3)
+    parser.add_argument("--thetas", type=float, nargs="+", default=[0.3, 0.5, 0.7, 1.0])
+    parser.add_argument("--softening", type=float, default=0.01)
+    parser.add_argument("--sample", type=int, default=1000, help="targets used for the direct reference")
+    args = parser.parse_args(argv)
+
+    pos, masses = plummer_sphere(args.n, args.dim)
+    rows = accuracy_report(pos, masses, thetas=args.thetas, softening=args.softening, sample=args.sample)
+
+    print(f"N = {args.n}, dim = {args.dim}, direct summation (extrapolated): {rows[0]['direct_s']:.2f} s")
+    print(f"{'theta':>6} {'build s':>8} {'total s':>8} {'speedup':>8} {'median err':>11} {'p99 err':>9} {'max err':>9}")
+    for row in rows:
+        print(f"{row['theta']:6.2f} {row['build_s']:8.3f} {row['total_s']:8.3f} {row['speedup']:8.1f} "
+              f"{row['median_err']:11.2e} {row['p99_err']:9.2e} {row['max_err']:9.2e}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
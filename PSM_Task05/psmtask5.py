@@ -1,5 +1,11 @@
+import argparse
+import json
+import os
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from psm_checkpoint import load_checkpoint, open_history, save_checkpoint
+from psm_plot import pyplot
 
 # Constants
 G = 6.6743e-11  # Gravitational constant [Nm^2/kg^2]
@@ -35,119 +41,486 @@ v_moon = np.sqrt(G * Mz / R_ZK)
 vx_moon_rel_0 = -v_moon * np.sin(theta_moon_0)
 vy_moon_rel_0 = v_moon * np.cos(theta_moon_0)
 
-# Initialize arrays to store positions
-x_earth = np.zeros(steps)
-y_earth = np.zeros(steps)
-x_moon = np.zeros(steps)
-y_moon = np.zeros(steps)
-
-# Set initial conditions
-x_earth[0] = x_earth_0
-y_earth[0] = y_earth_0
-x_moon[0] = x_earth_0 + x_moon_rel_0
-y_moon[0] = y_earth_0 + y_moon_rel_0
-
-# Velocity arrays
-vx_earth = np.zeros(steps)
-vy_earth = np.zeros(steps)
-vx_moon = np.zeros(steps)
-vy_moon = np.zeros(steps)
-
-vx_earth[0] = vx_earth_0
-vy_earth[0] = vy_earth_0
-vx_moon[0] = vx_earth_0 + vx_moon_rel_0
-vy_moon[0] = vy_earth_0 + vy_moon_rel_0
-
-# Improved Euler (Midpoint) method implementation
-for i in range(steps - 1):
-    # Current positions and velocities
-    xe, ye = x_earth[i], y_earth[i]
-    xm, ym = x_moon[i], y_moon[i]
-    vxe, vye = vx_earth[i], vy_earth[i]
-    vxm, vym = vx_moon[i], vy_moon[i]
-
-    # Distance calculations
-    r_es = np.sqrt(xe ** 2 + ye ** 2)  # Earth-Sun distance
-    r_em = np.sqrt((xm - xe) ** 2 + (ym - ye) ** 2)  # Moon-Earth distance
-    r_ms = np.sqrt(xm ** 2 + ym ** 2)  # Moon-Sun distance
-
-    # Current accelerations
-    # Earth acceleration due to Sun
-    ax_earth = -G * Ms * xe / r_es ** 3
-    ay_earth = -G * Ms * ye / r_es ** 3
-
-    # Moon acceleration components
-    # Due to Sun
-    ax_moon_sun = -G * Ms * xm / r_ms ** 3
-    ay_moon_sun = -G * Ms * ym / r_ms ** 3
-
-    # Due to Earth
-    ax_moon_earth = -G * Mz * (xm - xe) / r_em ** 3
-    ay_moon_earth = -G * Mz * (ym - ye) / r_em ** 3
-
-    # Total moon acceleration
-    ax_moon = ax_moon_sun + ax_moon_earth
-    ay_moon = ay_moon_sun + ay_moon_earth
+# Sun-Earth-Moon system as (N, 2) arrays; the Sun starts at rest at the origin
+def sun_earth_moon():
+    names = ["Sun", "Earth", "Moon"]
+    masses = np.array([Ms, Mz, Mk])
+    pos = np.array([
+        [0.0, 0.0],
+        [x_earth_0, y_earth_0],
+        [x_earth_0 + x_moon_rel_0, y_earth_0 + y_moon_rel_0],
+    ])
+    vel = np.array([
+        [0.0, 0.0],
+        [vx_earth_0, vy_earth_0],
+        [vx_earth_0 + vx_moon_rel_0, vy_earth_0 + vy_moon_rel_0],
+    ])
+    return names, masses, pos, vel
+
+# Position and velocity of a body on a circular orbit of the given radius
+# around a central mass (relative to that mass, orbit in the x-y plane).
+# Useful for adding planets, moons or asteroids to the initial state.
+def circular_orbit(central_mass, radius, theta=0.0, dim=2):
+    speed = np.sqrt(G * central_mass / radius)
+    pos = np.zeros(dim)
+    vel = np.zeros(dim)
+    pos[:2] = radius * np.cos(theta), radius * np.sin(theta)
+    vel[:2] = -speed * np.sin(theta), speed * np.cos(theta)
+    return pos, vel
+
+# Gravitational acceleration of every body due to all the others.
+# pos is (N, dim); pairwise separations are formed by broadcasting, in
+# blocks of rows so that memory stays at block * N * dim values.
+# softening (m) is added to every distance to avoid singular close encounters.
+# With targets (body indices) only their rows are computed; barnes_hut.py
+# uses this exact sum as its reference, with its own G.
+def accelerations(pos, masses, softening=0.0, block=1024, G=G, targets=None):
+    if targets is None:
+        targets = np.arange(len(pos))
+    acc = np.zeros((len(targets), pos.shape[1]))
+    for start in range(0, len(targets), block):
+        ids = targets[start:start + block]
+        diff = pos[np.newaxis, :, :] - pos[ids, np.newaxis, :]  # x_j - x_i
+        dist2 = np.sum(diff ** 2, axis=-1) + softening ** 2
+        # No self-interaction
+        dist2[np.arange(len(ids)), ids] = np.inf
+        weights = masses / dist2 ** 1.5
+        acc[start:start + block] = G * np.einsum('ij,ijk->ik', weights, diff)
+    return acc
+
+# Improved Euler (Midpoint) step: accelerations are re-evaluated at the
+# half-step positions and the half-step velocities move the positions
+def midpoint_step(pos, vel, dt, accel):
+    acc = accel(pos)
 
     # Predictor step (Euler)
-    xe_pred = xe + vxe * dt / 2
-    ye_pred = ye + vye * dt / 2
-    xm_pred = xm + vxm * dt / 2
-    ym_pred = ym + vym * dt / 2
-
-    vxe_pred = vxe + ax_earth * dt / 2
-    vye_pred = vye + ay_earth * dt / 2
-    vxm_pred = vxm + ax_moon * dt / 2
-    vym_pred = vym + ay_moon * dt / 2
-
-    # Recalculate distances at midpoint
-    r_es_pred = np.sqrt(xe_pred ** 2 + ye_pred ** 2)
-    r_em_pred = np.sqrt((xm_pred - xe_pred) ** 2 + (ym_pred - ye_pred) ** 2)
-    r_ms_pred = np.sqrt(xm_pred ** 2 + ym_pred ** 2)
-
-    # Recalculate accelerations at midpoint
-    # Earth acceleration due to Sun at midpoint
-    ax_earth_pred = -G * Ms * xe_pred / r_es_pred ** 3
-    ay_earth_pred = -G * Ms * ye_pred / r_es_pred ** 3
-
-    # Moon acceleration components at midpoint
-    # Due to Sun
-    ax_moon_sun_pred = -G * Ms * xm_pred / r_ms_pred ** 3
-    ay_moon_sun_pred = -G * Ms * ym_pred / r_ms_pred ** 3
-
-    # Due to Earth
-    ax_moon_earth_pred = -G * Mz * (xm_pred - xe_pred) / r_em_pred ** 3
-    ay_moon_earth_pred = -G * Mz * (ym_pred - ye_pred) / r_em_pred ** 3
-
-    # Total moon acceleration at midpoint
-    ax_moon_pred = ax_moon_sun_pred + ax_moon_earth_pred
-    ay_moon_pred = ay_moon_sun_pred + ay_moon_earth_pred
+    pos_pred = pos + vel * dt / 2
+    vel_pred = vel + acc * dt / 2
 
     # Corrector step
-    x_earth[i + 1] = xe + vxe_pred * dt
-    y_earth[i + 1] = ye + vye_pred * dt
-    x_moon[i + 1] = xm + vxm_pred * dt
-    y_moon[i + 1] = ym + vym_pred * dt
+    acc_pred = accel(pos_pred)
+    return pos + vel_pred * dt, vel + acc_pred * dt
+
+# Symplectic schemes. They exactly conserve a slightly perturbed energy, so
+# the energy error stays bounded on long runs instead of drifting.
+
+# Velocity Verlet / leapfrog (kick-drift-kick)
+def verlet_step(pos, vel, dt, accel):
+    vel_half = vel + accel(pos) * (dt / 2)
+    pos_new = pos + vel_half * dt
+    return pos_new, vel_half + accel(pos_new) * (dt / 2)
+
+# Yoshida 4th order: three leapfrog substeps with weights w1, w0, w1
+YOSHIDA_W1 = 1 / (2 - 2 ** (1 / 3))
+YOSHIDA_W0 = -2 ** (1 / 3) * YOSHIDA_W1
+
+def yoshida4_step(pos, vel, dt, accel):
+    for w in (YOSHIDA_W1, YOSHIDA_W0, YOSHIDA_W1):
+        pos, vel = verlet_step(pos, vel, w * dt, accel)
+    return pos, vel
+
+# Stumpff functions C(z) and S(z) used by the universal Kepler equation
+def _stumpff(z):
+    c = np.empty_like(z)
+    s = np.empty_like(z)
+    ell = z > 1e-8
+    hyp = z < -1e-8
+    par = ~(ell | hyp)
+    sz = np.sqrt(z[ell])
+    c[ell] = (1 - np.cos(sz)) / z[ell]
+    s[ell] = (sz - np.sin(sz)) / sz ** 3
+    sz = np.sqrt(-z[hyp])
+    c[hyp] = (np.cosh(sz) - 1) / -z[hyp]
+    s[hyp] = (np.sinh(sz) - sz) / sz ** 3
+    c[par] = 1 / 2 - z[par] / 24
+    s[par] = 1 / 6 - z[par] / 120
+    return c, s
+
+def kepler_drift(r0, v0, mu, dt, tol=1e-14, max_iter=50):
+    """Advance (N, dim) relative positions/velocities along Kepler orbits about mu = G * M.
+
+    Uses the universal variable formulation, so elliptic and hyperbolic
+    orbits are handled alike; the Kepler equation is solved by Newton's
+    method for all bodies at once.
+    """
+    r0n = np.linalg.norm(r0, axis=1)
+    vr0 = np.einsum('ij,ij->i', r0, v0) / r0n
+    alpha = 2 / r0n - np.einsum('ij,ij->i', v0, v0) / mu  # 1 / semi-major axis
+    sqmu = np.sqrt(mu)
+    a = r0n * vr0 / sqmu
+    b = 1 - alpha * r0n
+
+    chi = np.where(alpha > 0, sqmu * alpha * dt, sqmu * dt / r0n)
+    for _ in range(max_iter):
+        z = alpha * chi ** 2
+        c, s = _stumpff(z)
+        f = a * chi ** 2 * c + b * chi ** 3 * s + r0n * chi - sqmu * dt
+        df = a * chi * (1 - z * s) + b * chi ** 2 * c + r0n
+        delta = f / df
+        chi = chi - delta
+        if np.all(np.abs(delta) <= tol * np.maximum(np.abs(chi), 1e-300)):
+            break
+
+    # Lagrange coefficients
+    z = alpha * chi ** 2
+    c, s = _stumpff(z)
+    f = 1 - chi ** 2 / r0n * c
+    g = dt - chi ** 3 * s / sqmu
+    r = f[:, np.newaxis] * r0 + g[:, np.newaxis] * v0
+    rn = np.linalg.norm(r, axis=1)
+    fdot = sqmu / (rn * r0n) * (z * s - 1) * chi
+    gdot = 1 - chi ** 2 / rn * c
+    return r, fdot[:, np.newaxis] * r0 + gdot[:, np.newaxis] * v0
+
+def make_wisdom_holman_step(masses, central=0, softening=0.0, force="direct", theta=0.5):
+    """Wisdom-Holman splitting about a dominant central body.
+
+    Works in democratic heliocentric coordinates: every other body follows
+    an exact Kepler orbit about the central mass, and the mutual forces
+    between the other bodies and the central body's recoil are applied as
+    kicks and drifts around it. The splitting error is proportional to the
+    mass ratio to the central body. Satellites bound to another body (such
+    as the Moon around the Earth) are better served by yoshida4.
+    """
+    masses = np.asarray(masses, dtype=float)
+    others = np.arange(len(masses)) != central
+    m0 = masses[central]
+    m = masses[others]
+    m_total = masses.sum()
+    mu = G * m0
+    interaction = make_accel(m, softening, force, theta)
+
+    def step(pos, vel, dt, accel=None):
+        # Heliocentric positions and barycentric velocities
+        x_cm = masses @ pos / m_total
+        v_cm = masses @ vel / m_total
+        q = pos[others] - pos[central]
+        u = vel[others] - v_cm
+
+        u = u + interaction(q) * (dt / 2)
+        q = q + (m @ u / m0) * (dt / 2)
+        q, u = kepler_drift(q, u, mu, dt)
+        q = q + (m @ u / m0) * (dt / 2)
+        u = u + interaction(q) * (dt / 2)
+
+        # Back to inertial coordinates; the barycentre moves uniformly
+        x0 = x_cm + v_cm * dt - m @ q / m_total
+        new_pos = np.empty_like(pos)
+        new_vel = np.empty_like(vel)
+        new_pos[central] = x0
+        new_pos[others] = q + x0
+        new_vel[central] = v_cm - m @ u / m0
+        new_vel[others] = u + v_cm
+        return new_pos, new_vel
+
+    return step
+
+# Available time-stepping schemes; each maps (pos, vel, dt, accel) to the new (pos, vel)
+INTEGRATORS = {
+    "midpoint": midpoint_step,
+    "verlet": verlet_step,
+    "yoshida4": yoshida4_step,
+}
+# Schemes that need to know the masses are built per run:
+# factory(masses, softening, force, theta) -> step
+STEP_FACTORIES = {
+    "wisdom_holman": lambda masses, softening, force, theta: make_wisdom_holman_step(
+        masses, 0, softening, force, theta),
+}
+
+def get_step(integrator, masses, softening=0.0, force="direct", theta=0.5):
+    if integrator in INTEGRATORS:
+        return INTEGRATORS[integrator]
+    if integrator in STEP_FACTORIES:
+        return STEP_FACTORIES[integrator](masses, softening, force, theta)
+    raise ValueError(f"Unknown integrator {integrator!r}, expected one of "
+                     f"{sorted(INTEGRATORS) + sorted(STEP_FACTORIES)}")
+
+# Conserved quantities
+def total_energy(pos, vel, masses, softening=0.0, block=1024):
+    kinetic = 0.5 * np.sum(masses * np.sum(vel ** 2, axis=-1))
+    potential = 0.0
+    n = len(pos)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        diff = pos[np.newaxis, :, :] - pos[start:stop, np.newaxis, :]
+        dist = np.sqrt(np.sum(diff ** 2, axis=-1) + softening ** 2)
+        # Count every pair once (j > i)
+        dist[np.arange(n)[np.newaxis, :] <= np.arange(start, stop)[:, np.newaxis]] = np.inf
+        potential -= G * np.sum(masses[start:stop, np.newaxis] * masses / dist)
+    return kinetic + potential
+
+def angular_momentum(pos, vel, masses):
+    # Scalar (z component) in 2D, vector in 3D
+    if pos.shape[-1] == 2:
+        return np.sum(masses * (pos[:, 0] * vel[:, 1] - pos[:, 1] * vel[:, 0]))
+    return np.sum(masses[:, np.newaxis] * np.cross(pos, vel), axis=0)
+
+def conservation_errors(positions, velocities, masses, softening=0.0, every=1):
+    """Relative energy and angular momentum errors with respect to the first sample."""
+    energy = np.array([total_energy(p, v, masses, softening)
+                       for p, v in zip(positions[::every], velocities[::every])])
+    momentum = np.array([angular_momentum(p, v, masses)
+                         for p, v in zip(positions[::every], velocities[::every])])
+    energy_err = np.abs(energy - energy[0]) / abs(energy[0])
+    momentum_err = np.linalg.norm(np.reshape(momentum - momentum[0], (len(momentum), -1)), axis=1)
+    momentum_err /= np.linalg.norm(momentum[0])
+    return energy_err, momentum_err
+
+# Force evaluation backends: exact direct summation, or the Barnes-Hut tree
+# from barnes_hut.py (O(N log N), accuracy set by the opening angle theta)
+def make_accel(masses, softening=0.0, force="direct", theta=0.5):
+    masses = np.asarray(masses, dtype=float)
+    if force == "direct":
+        accel = lambda pos: accelerations(pos, masses, softening)
+    elif force == "barnes_hut":
+        import barnes_hut
+        accel = lambda pos: barnes_hut.accelerations(pos, masses, G, theta, softening)
+    else:
+        raise ValueError(f"Unknown force backend {force!r}, expected 'direct' or 'barnes_hut'")
+    return _reuse_last(accel)
+
+def _reuse_last(accel):
+    # Leapfrog-type schemes ask for the force at the positions they just
+    # produced, at the end of one kick and again at the start of the next;
+    # remembering the last result halves the number of force evaluations
+    last = {"pos": None, "acc": None}
+
+    def cached(pos):
+        if pos is not last["pos"]:
+            last["pos"], last["acc"] = pos, accel(pos)
+        return last["acc"]
 
-    vx_earth[i + 1] = vxe + ax_earth_pred * dt
-    vy_earth[i + 1] = vye + ay_earth_pred * dt
-    vx_moon[i + 1] = vxm + ax_moon_pred * dt
-    vy_moon[i + 1] = vym + ay_moon_pred * dt
+    return cached
+
+# Streaming trajectory storage
+class TrajectorySink:
+    """Writes every stride-th (pos, vel) sample of a run to a .npy file.
+
+    The file is a memory-mapped array of shape (rows, 2, N, dim) holding
+    positions and velocities. Samples are collected in a small buffer and
+    written one chunk at a time; a JSON sidecar (path + ".json") records how
+    many rows are valid, so an interrupted run can resume from the last
+    written chunk and readers never see half-written data. Resuming is
+    refused unless steps, stride, dt and integrator match the stored run.
+    """
+
+    def __init__(self, path, steps, n_bodies, dim, stride=1, dt=None, chunk=1024, resume=False,
+                 integrator=None):
+        self.path = path
+        self.stride = stride
+        self.meta_path = path + ".json"
+        if resume and os.path.exists(path) and os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            run = {"steps": steps, "stride": stride, "dt": dt, "integrator": integrator}
+            stored = {key: meta.get(key) for key in run}
+            if stored != run:
+                raise ValueError(f"{path} was written by a different run: {stored}")
+            self.data = np.lib.format.open_memmap(path, mode="r+")
+            self.rows = meta["rows"]
+            self.resumed = True
+        else:
+            shape = ((steps - 1) // stride + 1, 2, n_bodies, dim)
+            self.data = np.lib.format.open_memmap(path, mode="w+", dtype=float, shape=shape)
+            self.rows = 0
+            self.resumed = False
+        self.meta = {"steps": steps, "stride": stride, "dt": dt, "integrator": integrator, "rows": self.rows}
+        self.buffer = np.empty((chunk, 2, n_bodies, dim))
+        self.filled = 0
+
+    def append(self, pos, vel):
+        self.buffer[self.filled, 0] = pos
+        self.buffer[self.filled, 1] = vel
+        self.filled += 1
+        if self.filled == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if self.filled:
+            self.data[self.rows:self.rows + self.filled] = self.buffer[:self.filled]
+            self.data.flush()
+            self.rows += self.filled
+            self.filled = 0
+        self.meta["rows"] = self.rows
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def last_sample(self):
+        # Step index, positions and velocities of the last row on disk
+        row = self.data[self.rows - 1]
+        return (self.rows - 1) * self.stride, np.array(row[0]), np.array(row[1])
+
+    def close(self):
+        self.flush()
+        del self.data
+
+def load_trajectory(path):
+    """Lazily open a stored trajectory: (positions, velocities, metadata).
+
+    positions and velocities are read-only memory-mapped (rows, N, dim)
+    views, so only the parts that are actually used are read from disk.
+    """
+    with open(path + ".json") as f:
+        meta = json.load(f)
+    data = np.load(path, mmap_mode="r")[:meta["rows"]]
+    return data[:, 0], data[:, 1], meta
+
+def simulate(pos0, vel0, masses, dt, steps, integrator="midpoint", softening=0.0, force="direct", theta=0.5,
+             sink=None, checkpoint=None, checkpoint_every=10000, resume=False):
+    """Integrate an N-body system and return (steps, N, dim) positions and velocities.
+
+    With a TrajectorySink only the current state is kept in memory: every
+    sink.stride-th step is streamed to disk and the memory-mapped arrays
+    are returned instead. If the sink already holds rows (resume), the run
+    continues from its last sample.
+
+    With a checkpoint path the state is saved every checkpoint_every steps
+    and resume=True continues bit-identically from the saved step. Without
+    a sink the trajectory is then kept in a memory-mapped history file next
+    to the checkpoint (psm_checkpoint.open_history).
+    """
+    step = get_step(integrator, masses, softening, force, theta)
+    accel = make_accel(masses, softening, force, theta)
+    params = {"integrator": integrator, "dt": float(dt), "steps": int(steps), "softening": float(softening),
+              "force": force, "theta": float(theta), "stride": sink.stride if sink is not None else 1}
+
+    resuming = checkpoint is not None and resume and os.path.exists(checkpoint)
+    history = None
+    if sink is None:
+        if checkpoint is None:
+            positions = np.zeros((steps,) + np.shape(pos0))
+            velocities = np.zeros((steps,) + np.shape(vel0))
+        else:
+            history = open_history(checkpoint, steps, {"positions": np.shape(pos0), "velocities": np.shape(vel0)},
+                                   resuming)
+            positions, velocities = history["positions"], history["velocities"]
+
+        def record(i, pos, vel):
+            positions[i] = pos
+            velocities[i] = vel
+
+        def snapshot(i):
+            return {}
+    else:
+        def record(i, pos, vel):
+            if i % sink.stride == 0:
+                sink.append(pos, vel)
+
+        def snapshot(i):
+            # Rows on disk must match the checkpoint, so the buffer is written first
+            sink.flush()
+            return {"sink_rows": sink.rows}
+
+    pos = np.array(pos0, dtype=float)
+    vel = np.array(vel0, dtype=float)
+    first = 0
+    if resuming:
+        first, state = load_checkpoint(checkpoint, params)
+        pos, vel = state["pos"], state["vel"]
+        if sink is not None:
+            # The sink must be the file the checkpoint was written with, not a fresh empty one
+            sink_rows = int(state["sink_rows"])
+            if not sink.resumed or sink.rows < sink_rows:
+                raise ValueError(f"cannot resume from {checkpoint}: {sink.path} does not hold the "
+                                 f"{sink_rows} rows written before it")
+            sink.rows = sink_rows
+    elif sink is not None and sink.rows:
+        first, pos, vel = sink.last_sample()
+    else:
+        record(0, pos, vel)
+
+    for i in range(first, steps - 1):
+        pos, vel = step(pos, vel, dt, accel)
+        record(i + 1, pos, vel)
+        if checkpoint is not None and (i + 1) % checkpoint_every == 0:
+            save_checkpoint(checkpoint, i + 1, dict(snapshot(i + 1), pos=pos, vel=vel), params, history)
+
+    if sink is None:
+        if history is not None:
+            history.flush()
+        return positions, velocities
+    sink.close()
+    positions, velocities, _ = load_trajectory(sink.path)
+    return positions, velocities
+
+def run_simulation(steps=steps, dt=dt, integrator="midpoint", force="direct", theta=0.5,
+                   trajectory=None, save_every=1, resume=False, checkpoint=None, checkpoint_every=10000):
+    # For the default system the Sun is body 0, the central body of wisdom_holman
+    names, masses, pos0, vel0 = sun_earth_moon()
+    sink = None
+    if trajectory is not None:
+        sink = TrajectorySink(trajectory, steps, len(masses), pos0.shape[1], save_every, dt, resume=resume,
+                              integrator=integrator)
+    positions, velocities = simulate(pos0, vel0, masses, dt, steps, integrator, force=force, theta=theta, sink=sink,
+                                     checkpoint=checkpoint, checkpoint_every=checkpoint_every, resume=resume)
+    return {"names": names, "masses": masses, "positions": positions, "velocities": velocities}
 
 # Plotting
-plt.figure(figsize=(10, 10))
-plt.plot(x_earth, y_earth, 'b', label="Earth's orbit")
-plt.plot(x_moon, y_moon, 'r', label="Moon's trajectory", alpha=0.5)
-plt.plot(0, 0, 'yo', markersize=10, label="Sun")  # Sun at origin
-
-# Add some annotations
-plt.plot(x_earth[0], y_earth[0], 'bo', label="Earth start")
-plt.plot(x_moon[0], y_moon[0], 'ro', label="Moon start")
-
-plt.xlabel('X position (m)')
-plt.ylabel('Y position (m)')
-plt.title("Moon's Trajectory Relative to the Sun")
-plt.legend()
-plt.grid(True)
-plt.axis('equal')
-plt.show()
\ No newline at end of file
+# Matplotlib format strings for the bodies of the default system
+STYLES = {"Sun": "y", "Earth": "b", "Moon": "r"}
+
+def plot_results(results, save=None):
+    plt = pyplot(save)
+    positions = results["positions"]
+    # A few hundred thousand points per line are plenty for a figure
+    positions = positions[::max(1, len(positions) // 200000)]
+
+    plt.figure(figsize=(10, 10))
+    for i, name in enumerate(results["names"]):
+        color = STYLES.get(name, "k")
+        plt.plot(positions[:, i, 0], positions[:, i, 1], color, label=f"{name}'s trajectory", alpha=0.7)
+
+        # Add some annotations
+        plt.plot(positions[0, i, 0], positions[0, i, 1], color + 'o', label=f"{name} start")
+
+    plt.xlabel('X position (m)')
+    plt.ylabel('Y position (m)')
+    plt.title("Moon's Trajectory Relative to the Sun")
+    plt.legend()
+    plt.grid(True)
+    plt.axis('equal')
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sun-Earth-Moon N-body simulation.")
+    parser.add_argument("--no-plot", action="store_true", help="only run the simulation, do not render anything")
+    parser.add_argument("--save", metavar="PATH", help="write the figure to PATH instead of opening a window")
+    parser.add_argument("--integrator", choices=sorted(INTEGRATORS) + sorted(STEP_FACTORIES),
+                        default="midpoint", help="time-stepping scheme")
+    parser.add_argument("--days", type=float, default=days, help="simulated time in days")
+    parser.add_argument("--dt", type=float, default=dt, help="time step in seconds")
+    parser.add_argument("--force", choices=["direct", "barnes_hut"], default="direct",
+                        help="direct summation or Barnes-Hut tree")
+    parser.add_argument("--theta", type=float, default=0.5, help="Barnes-Hut opening angle")
+    parser.add_argument("--trajectory", metavar="PATH",
+                        help="stream the trajectory to this .npy file instead of keeping it in memory")
+    parser.add_argument("--save-every", type=int, default=1, help="store every N-th step of the trajectory")
+    parser.add_argument("--checkpoint", metavar="PATH", help="periodically save the integrator state to this .npz file")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="steps between checkpoints")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from --checkpoint (or the run stored in --trajectory)")
+    args = parser.parse_args(argv)
+
+    n_steps = int(args.days * 24 * 3600 / args.dt)
+    results = run_simulation(n_steps, args.dt, args.integrator, args.force, args.theta,
+                             args.trajectory, args.save_every, args.resume,
+                             args.checkpoint, args.checkpoint_every)
+
+    energy_err, momentum_err = conservation_errors(
+        results["positions"], results["velocities"], results["masses"],
+        every=max(1, len(results["positions"]) // 1000))
+    print(f"{args.integrator}: max relative energy error {energy_err.max():.3e}, "
+          f"angular momentum error {momentum_err.max():.3e}")
+    if not args.no_plot:
+        plot_results(results, save=args.save)
+    return results
+
+if __name__ == "__main__":
+    main()
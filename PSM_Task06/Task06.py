@@ -1,5 +1,11 @@
+import argparse
+import os
+from time import perf_counter
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from psm_checkpoint import load_checkpoint, open_history, save_checkpoint
+from psm_plot import pyplot
 
 # Constants
 L = np.pi         # Length of the string
@@ -13,69 +19,237 @@ steps = int(T / dt)
 # Spatial positions along the string
 x = np.linspace(0, L, N + 1)
 
-# Initial displacement (sinusoidal shape)
-y = np.sin(x)
-y[0] = 0
-y[-1] = 0
+# Initial displacement (sinusoidal shape) and initial velocity
+def initial_state(n=N):
+    y = np.sin(x if n == N else np.linspace(0, L, n + 1))
+    y[0] = 0
+    y[-1] = 0
+    v = np.zeros(n + 1)
+    return y, v
 
-# Initial velocity
-v = np.zeros(N + 1)
+# Discrete Laplacian (times c^2) by slicing. With out given the result is
+# written there and nothing is allocated; the end points stay zero.
+def compute_acceleration(y, dx, out=None, c=1):
+    if out is None:
+        out = np.zeros_like(y)
+    inner = out[1:-1]
+    np.multiply(y[1:-1], 2, out=inner)
+    np.subtract(y[:-2], inner, out=inner)
+    inner += y[2:]
+    inner /= (dx / c)**2
+    out[0] = 0
+    out[-1] = 0
+    return out
 
-# Function to compute acceleration using finite difference
-def compute_acceleration(y, dx):
-    a = np.zeros_like(y)
-    for i in range(1, len(y) - 1):
-        a[i] = (y[i - 1] - 2 * y[i] + y[i + 1]) / dx**2
-    return a
+# Kinetic and potential energy of a string (1D), membrane (2D) or volume
+# (3D) on a grid with spacing dx. work is a scratch array shaped like y, so
+# nothing is allocated; with periodic=True the wrap-around edges count too.
+def grid_energies(y, v, dx, work, periodic=False):
+    cell = dx**y.ndim
+    np.multiply(v, v, out=work)
+    Ek = 0.5 * cell * np.sum(work)
+    total = 0.0
+    for axis in range(y.ndim):
+        def cut(start, stop):
+            return (slice(None),) * axis + (slice(start, stop),)
+        diff = work if periodic else work[cut(None, -1)]
+        np.subtract(y[cut(1, None)], y[cut(None, -1)], out=diff[cut(None, y.shape[axis] - 1)])
+        if periodic:
+            np.subtract(y[cut(None, 1)], y[cut(-1, None)], out=diff[cut(-1, None)])
+        diff *= diff
+        diff /= dx
+        total += np.sum(diff)
+    Ep = 0.5 * (cell / dx) * total
+    return Ek, Ep
 
-# Lists to store energy values over time
-potential_energy = []
-kinetic_energy = []
-total_energy = []
+def run_simulation(steps=steps, dt=dt, n=N, checkpoint=None, checkpoint_every=1000, resume=False):
+    dx = L / n
+    y, v = initial_state(n)
 
-# Time evolution loop using the Midpoint Method
-for step in range(steps):
-    # Compute acceleration at current time
-    a = compute_acceleration(y, dx)
+    # Preallocated buffers: the time loop itself allocates no arrays
+    a = np.empty_like(y)
+    v_half = np.empty_like(y)
+    y_half = np.empty_like(y)
+    work = np.empty_like(y)
 
-    # Midpoint prediction
-    v_half = v + 0.5 * dt * a
-    y_half = y + 0.5 * dt * v
+    # Energy history; with checkpoints it is a memory-mapped file next to the checkpoint
+    resuming = checkpoint is not None and resume and os.path.exists(checkpoint)
+    history = None
+    if checkpoint is None:
+        kinetic_energy = np.zeros(steps)
+        potential_energy = np.zeros(steps)
+        total_energy = np.zeros(steps)
+    else:
+        history = open_history(checkpoint, steps, {"Ek": (), "Ep": (), "Et": ()}, resuming)
+        kinetic_energy, potential_energy, total_energy = history["Ek"], history["Ep"], history["Et"]
 
-    # Acceleration at midpoint
-    a_half = compute_acceleration(y_half, dx)
+    # Continue an interrupted run from its last checkpoint
+    params = {"steps": int(steps), "dt": float(dt), "L": float(L), "N": int(n), "c": c}
+    first = 0
+    if resuming:
+        first, state = load_checkpoint(checkpoint, params)
+        y[:], v[:] = state["y"], state["v"]
 
-    # Full-step update
-    v += dt * a_half
-    y += dt * v_half
+    # Time evolution loop using the Midpoint Method
+    start = perf_counter()
+    for step in range(first, steps):
+        # Compute acceleration at current time
+        compute_acceleration(y, dx, out=a, c=c)
 
-    # Apply boundary conditions (fixed ends)
-    y[0] = 0
-    y[-1] = 0
-    v[0] = 0
-    v[-1] = 0
+        # Midpoint prediction
+        np.multiply(a, 0.5 * dt, out=v_half)
+        v_half += v
+        np.multiply(v, 0.5 * dt, out=y_half)
+        y_half += y
+
+        # Acceleration at midpoint
+        compute_acceleration(y_half, dx, out=a, c=c)
+
+        # Full-step update
+        a *= dt
+        v += a
+        v_half *= dt
+        y += v_half
+
+        # Apply boundary conditions (fixed ends)
+        y[0] = 0
+        y[-1] = 0
+        v[0] = 0
+        v[-1] = 0
+
+        # Compute energies
+        Ek, Ep = grid_energies(y, v, dx, work)
+        kinetic_energy[step] = Ek
+        potential_energy[step] = Ep
+        total_energy[step] = Ek + Ep
+
+        if checkpoint is not None and (step + 1) % checkpoint_every == 0:
+            save_checkpoint(checkpoint, step + 1, {"y": y, "v": v}, params, history)
+    elapsed = perf_counter() - start
+    if history is not None:
+        history.flush()
 
-    # Compute energies
-    Ek = 0.5 * dx * np.sum(v**2)
-    Ep = 0.5 * np.sum(((y[1:] - y[:-1])**2) / dx)
-    Et = Ek + Ep
+    # Time array for plotting
+    time = np.linspace(0, steps * dt, steps)
 
-    kinetic_energy.append(Ek)
-    potential_energy.append(Ep)
-    total_energy.append(Et)
+    return {
+        "time": time, "y": y, "v": v,
+        "Ek": kinetic_energy, "Ep": potential_energy, "Et": total_energy,
+        # Grid-point updates per second of the time loop
+        "throughput": (steps - first) * (n + 1) / elapsed if elapsed > 0 else float("inf"),
+    }
 
-# Time array for plotting
-time = np.linspace(0, T, steps)
+# Spectral solver
+# With fixed ends the semi-discrete system y'' = c^2 (y[i-1] - 2 y[i] + y[i+1]) / dx^2
+# is diagonal in the discrete sine basis: mode k oscillates with
+# omega_k = (2 c / dx) sin(k pi / (2 n)), so the state at any time follows
+# from one projection of the initial data, without stepping.
+def dst1(u):
+    # Orthonormal DST-I along the last axis via the FFT of the odd extension; it is its own inverse
+    u = np.asarray(u, dtype=float)
+    n = u.shape[-1] + 1
+    w = np.zeros(u.shape[:-1] + (2 * n,))
+    w[..., 1:n] = u
+    w[..., n + 1:] = -u[..., ::-1]
+    return -np.fft.rfft(w)[..., 1:n].imag * np.sqrt(0.5 / n)
+
+def modal_decomposition(y, v, dx=dx, c=c):
+    n = len(y) - 1
+    k = np.arange(1, n)
+    return {
+        "y_hat": dst1(y[1:-1]), "v_hat": dst1(v[1:-1]),
+        "omega": 2 * c / dx * np.sin(k * np.pi / (2 * n)),
+        "dx": dx, "c": c,
+    }
+
+def _modal_coefficients(modes, t):
+    # Mode amplitudes at time(s) t, shape t.shape + (n - 1,)
+    phase = np.multiply.outer(np.asarray(t, dtype=float), modes["omega"])
+    cos, sin = np.cos(phase), np.sin(phase)
+    y_hat = modes["y_hat"] * cos + modes["v_hat"] / modes["omega"] * sin
+    v_hat = modes["v_hat"] * cos - modes["y_hat"] * modes["omega"] * sin
+    return y_hat, v_hat
+
+def spectral_state(modes, t):
+    """Displacement and velocity (including the fixed ends) at time(s) t.
+
+    t may be a scalar or an array; the cost is one O(N log N) transform
+    per query time, independent of how large t is.
+    """
+    y_hat, v_hat = _modal_coefficients(modes, t)
+    pad = [(0, 0)] * (y_hat.ndim - 1) + [(1, 1)]
+    return np.pad(dst1(y_hat), pad), np.pad(dst1(v_hat), pad)
+
+def spectral_energies(modes, t):
+    # The transform is orthonormal, so the energies follow from the mode amplitudes (O(N) per time)
+    y_hat, v_hat = _modal_coefficients(modes, t)
+    Ek = 0.5 * modes["dx"] * np.sum(v_hat**2, axis=-1)
+    Ep = 0.5 * modes["dx"] * np.sum((modes["omega"] / modes["c"])**2 * y_hat**2, axis=-1)
+    return Ek, Ep
+
+def cross_check(steps=steps, dt=dt, n=N):
+    # Largest deviation of the midpoint stepper from the exact semi-discrete solution
+    y0, v0 = initial_state(n)
+    modes = modal_decomposition(y0, v0, L / n)
+    stepped = run_simulation(steps, dt, n)
+    times = (np.arange(steps) + 1) * dt
+    y, _ = spectral_state(modes, times[-1])
+    Ek, Ep = spectral_energies(modes, times)
+    return np.max(np.abs(stepped["y"] - y)), np.max(np.abs(stepped["Et"] - (Ek + Ep)))
 
 # Plot energies over time
-plt.figure(figsize=(10, 6))
-plt.plot(time, kinetic_energy, label='Kinetic Energy (Ek)')
-plt.plot(time, potential_energy, label='Potential Energy (Ep)')
-plt.plot(time, total_energy, label='Total Energy (Et)', linestyle='--')
-plt.xlabel('Time')
-plt.ylabel('Energy')
-plt.title('Energy of the Vibrating String Over Time')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+def plot_results(results, save=None):
+    plt = pyplot(save)
+    time = results["time"]
+
+    plt.figure(figsize=(10, 6))
+    plt.plot(time, results["Ek"], label='Kinetic Energy (Ek)')
+    plt.plot(time, results["Ep"], label='Potential Energy (Ep)')
+    plt.plot(time, results["Et"], label='Total Energy (Et)', linestyle='--')
+    plt.xlabel('Time')
+    plt.ylabel('Energy')
+    plt.title('Energy of the Vibrating String Over Time')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vibrating string with fixed ends (Midpoint method).")
+    parser.add_argument("--no-plot", action="store_true", help="only run the simulation, do not render anything")
+    parser.add_argument("--save", metavar="PATH", help="write the figure to PATH instead of opening a window")
+    parser.add_argument("--steps", type=int, default=steps, help="number of time steps")
+    parser.add_argument("--dt", type=float, default=dt, help="time step (stable for dt <= dx / c)")
+    parser.add_argument("--points", type=int, default=N, help="number of grid intervals along the string")
+    parser.add_argument("--checkpoint", metavar="PATH", help="periodically save the state to this .npz file")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="steps between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="continue from the state stored in --checkpoint")
+    parser.add_argument("--at", type=float, nargs="+", metavar="T",
+                        help="print the exact (spectral) energies at these times")
+    parser.add_argument("--cross-check", action="store_true",
+                        help="compare the midpoint stepper with the spectral solution")
+    args = parser.parse_args(argv)
+
+    if args.at:
+        y0, v0 = initial_state(args.points)
+        modes = modal_decomposition(y0, v0, L / args.points)
+        Ek, Ep = spectral_energies(modes, args.at)
+        for t, k, p in zip(args.at, Ek, Ep):
+            print(f"t = {t:g}: Ek = {k:.6f}, Ep = {p:.6f}, Et = {k + p:.6f}")
+    if args.cross_check:
+        dy, dE = cross_check(args.steps, args.dt, args.points)
+        print(f"midpoint vs spectral: max |dy| = {dy:.3e}, max |dEt| = {dE:.3e}")
+
+    results = run_simulation(args.steps, args.dt, args.points, checkpoint=args.checkpoint,
+                             checkpoint_every=args.checkpoint_every, resume=args.resume)
+    print(f"{results['throughput']:.3e} grid-point updates/s")
+    if not args.no_plot:
+        plot_results(results, save=args.save)
+    return results
+
+if __name__ == "__main__":
+    main()
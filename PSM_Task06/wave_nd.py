@@ -0,0 +1,229 @@
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from psm_plot import pyplot
+
+from Task06 import L, c, grid_energies
+
+# The midpoint wave scheme of Task06 on 2D and 3D grids. The grid spacing dx
+# is the same along every axis. Fixed boundaries hold the outer faces at
+# zero (n + 1 nodes per axis, like the string); periodic boundaries wrap
+# around (n nodes per axis).
+
+def grid_shape(intervals, periodic=False):
+    return tuple(n if periodic else n + 1 for n in intervals)
+
+def initial_state(intervals, periodic=False):
+    # Product of sines: the lowest mode for fixed faces, one full period when periodic
+    y = np.ones(grid_shape(intervals, periodic))
+    for axis, n in enumerate(intervals):
+        if periodic:
+            profile = np.sin(2 * np.pi * np.arange(n) / n)
+        else:
+            profile = np.sin(np.pi * np.arange(n + 1) / n)
+            profile[0] = profile[-1] = 0
+        y *= profile.reshape((-1,) + (1,) * (len(intervals) - axis - 1))
+    return y, np.zeros_like(y)
+
+def default_tile(shape, target_bytes=1 << 21):
+    # Rows per slab so that one slab is about 2 MB: the working set of a tile stays in cache
+    row_bytes = 8 * int(np.prod(shape[1:]))
+    return max(1, min(shape[0], target_bytes // row_bytes))
+
+def make_buffers(shape, tile):
+    # Slab-sized scratch arrays, allocated once per run
+    rest = tuple(shape[1:])
+    return {
+        "ext": np.empty((tile + 2,) + rest),
+        "lap": np.empty((tile,) + rest),
+        "tmp": np.empty((tile,) + rest),
+        "v_half": np.empty((tile,) + rest),
+        "new": [np.empty((tile,) + rest), np.empty((tile,) + rest)],
+        "first_row": np.empty(rest),
+    }
+
+def _add_neighbours(out, center, axis, periodic):
+    # out += center shifted by one in both directions along axis
+    def cut(start, stop):
+        return (slice(None),) * axis + (slice(start, stop),)
+    out[cut(1, None)] += center[cut(None, -1)]
+    out[cut(None, -1)] += center[cut(1, None)]
+    if periodic:
+        out[cut(None, 1)] += center[cut(-1, None)]
+        out[cut(-1, None)] += center[cut(None, 1)]
+
+def laplacian_slab(u, i0, i1, dx, periodic, buffers, first_row=None):
+    """c^2 times the discrete Laplacian of u for rows i0:i1 of axis 0.
+
+    The slab and its two halo rows are copied into buffers["ext"], so the
+    result only depends on rows i0 - 1 .. i1 of u. For periodic grids
+    first_row replaces u[0] as the halo of the last slab (u[0] may already
+    hold the new state). Fixed faces get zero acceleration.
+    """
+    m = i1 - i0
+    n0 = u.shape[0]
+    ext = buffers["ext"][:m + 2]
+    ext[1:-1] = u[i0:i1]
+    if i0 > 0:
+        ext[0] = u[i0 - 1]
+    elif periodic:
+        ext[0] = u[-1]
+    else:
+        ext[0] = 0
+    if i1 < n0:
+        ext[-1] = u[i1]
+    elif periodic:
+        ext[-1] = u[0] if first_row is None else first_row
+    else:
+        ext[-1] = 0
+
+    out = buffers["lap"][:m]
+    center = ext[1:-1]
+    np.add(ext[:-2], ext[2:], out=out)
+    for axis in range(1, u.ndim):
+        _add_neighbours(out, center, axis, periodic)
+    tmp = buffers["tmp"][:m]
+    np.multiply(center, -2 * u.ndim, out=tmp)
+    out += tmp
+    out /= (dx / c)**2
+
+    if not periodic:
+        for axis in range(1, u.ndim):
+            index = (slice(None),) * axis
+            out[index + (0,)] = 0
+            out[index + (-1,)] = 0
+        if i0 == 0:
+            out[0] = 0
+        if i1 == n0:
+            out[-1] = 0
+    return out
+
+def midpoint_step(y, v, y_half, dt, dx, periodic, tile, buffers):
+    """One midpoint step done in place, slab by slab along axis 0.
+
+    y_half = y + dt/2 v is the only full-size temporary. v is updated as
+    soon as a slab is done; the new y of a slab is held back until the
+    next slab has read its halo row (double buffering), so every slab sees
+    the old y.
+    """
+    np.multiply(v, 0.5 * dt, out=y_half)
+    y_half += y
+    first_row = None
+    if periodic:
+        first_row = buffers["first_row"]
+        first_row[...] = y[0]
+
+    pending = None
+    for k, i0 in enumerate(range(0, y.shape[0], tile)):
+        i1 = min(i0 + tile, y.shape[0])
+        m = i1 - i0
+
+        # Midpoint prediction of v
+        a = laplacian_slab(y, i0, i1, dx, periodic, buffers, first_row)
+        v_half = buffers["v_half"][:m]
+        np.multiply(a, 0.5 * dt, out=v_half)
+        v_half += v[i0:i1]
+
+        # The previous slab's halo has been read, its new state can be stored
+        if pending is not None:
+            p0, p1, new = pending
+            y[p0:p1] = new
+
+        # Full-step update
+        a = laplacian_slab(y_half, i0, i1, dx, periodic, buffers)
+        a *= dt
+        v[i0:i1] += a
+        new = buffers["new"][k % 2][:m]
+        np.multiply(v_half, dt, out=new)
+        new += y[i0:i1]
+        pending = (i0, i1, new)
+
+    p0, p1, new = pending
+    y[p0:p1] = new
+
+def run_simulation(intervals=(200, 200), steps=200, dt=None, periodic=False, energy_every=10, tile=None):
+    """Integrate the wave equation on a 2D or 3D grid.
+
+    Energies are sampled every energy_every steps (and at t = 0) into
+    preallocated arrays; y_half doubles as their scratch array.
+    """
+    dx = L / intervals[0]
+    if dt is None:
+        dt = 0.2 * dx / (c * np.sqrt(len(intervals)))
+    y, v = initial_state(intervals, periodic)
+    y_half = np.empty_like(y)
+    tile = tile or default_tile(y.shape)
+    buffers = make_buffers(y.shape, tile)
+
+    samples = steps // energy_every + 1
+    time = np.arange(samples) * energy_every * dt
+    kinetic_energy = np.zeros(samples)
+    potential_energy = np.zeros(samples)
+    kinetic_energy[0], potential_energy[0] = grid_energies(y, v, dx, y_half, periodic)
+
+    start = perf_counter()
+    for step in range(1, steps + 1):
+        midpoint_step(y, v, y_half, dt, dx, periodic, tile, buffers)
+        if step % energy_every == 0:
+            sample = step // energy_every
+            kinetic_energy[sample], potential_energy[sample] = grid_energies(y, v, dx, y_half, periodic)
+    elapsed = perf_counter() - start
+
+    return {
+        "time": time, "y": y, "v": v, "dx": dx, "dt": dt,
+        "Ek": kinetic_energy, "Ep": potential_energy, "Et": kinetic_energy + potential_energy,
+        "throughput": steps * y.size / elapsed if elapsed > 0 else float("inf"),
+    }
+
+def plot_results(results, save=None):
+    plt = pyplot(save)
+    y = results["y"]
+    # 3D fields are shown through their middle slice
+    while y.ndim > 2:
+        y = y[y.shape[0] // 2]
+
+    plt.figure(figsize=(12, 5))
+    plt.subplot(1, 2, 1)
+    plt.plot(results["time"], results["Ek"], label='Kinetic Energy (Ek)')
+    plt.plot(results["time"], results["Ep"], label='Potential Energy (Ep)')
+    plt.plot(results["time"], results["Et"], label='Total Energy (Et)', linestyle='--')
+    plt.xlabel('Time')
+    plt.ylabel('Energy')
+    plt.legend()
+    plt.grid(True)
+
+    plt.subplot(1, 2, 2)
+    plt.imshow(y, cmap='RdBu_r', origin='lower')
+    plt.colorbar(label='Displacement')
+    plt.title('Final displacement')
+    plt.tight_layout()
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="2D/3D wave equation with the midpoint method.")
+    parser.add_argument("--shape", type=int, nargs="+", default=[200, 200],
+                        help="grid intervals per axis, two or three numbers")
+    parser.add_argument("--periodic", action="store_true", help="periodic instead of fixed boundaries")
+    parser.add_argument("--steps", type=int, default=200, help="number of time steps")
+    parser.add_argument("--dt", type=float, help="time step (default 0.2 dx / (c sqrt(dim)))")
+    parser.add_argument("--energy-every", type=int, default=10, help="steps between energy samples")
+    parser.add_argument("--tile", type=int, help="rows per slab (default: about 2 MB per slab)")
+    parser.add_argument("--no-plot", action="store_true", help="only run the simulation, do not render anything")
+    parser.add_argument("--save", metavar="PATH", help="write the figure to PATH instead of opening a window")
+    args = parser.parse_args(argv)
+
+    results = run_simulation(tuple(args.shape), args.steps, args.dt, args.periodic, args.energy_every, args.tile)
+    drift = np.max(np.abs(results["Et"] - results["Et"][0])) / results["Et"][0]
+    print(f"{results['throughput']:.3e} grid-point updates/s, relative energy drift {drift:.2e}")
+    if not args.no_plot:
+        plot_results(results, save=args.save)
+    return results
+
+if __name__ == "__main__":
+    main()
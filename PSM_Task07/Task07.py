@@ -1,7 +1,11 @@
+import argparse
+import os
+from functools import lru_cache
+from time import perf_counter
+
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.sparse import lil_matrix
-from scipy.sparse.linalg import spsolve
+
+from psm_plot import pyplot
 
 # Grid size
 n = 41  # 41x41 (including boundaries)
@@ -16,64 +20,254 @@ bottom = -300
 left = -200
 right = 300
 
+# 5-point Laplacian on the inner nodes as a Kronecker sum of the 1D
+# second-difference matrix T = tridiag(1, -2, 1): I x T couples the
+# left/right neighbours, T x I the top/bottom ones. Linear in the number of nodes.
+def build_matrix(n=n):
+    from scipy.sparse import diags, kronsum
+
+    inner_n = n - 2
+    T = diags([np.ones(inner_n - 1), -2 * np.ones(inner_n), np.ones(inner_n - 1)], [-1, 0, 1])
+    return kronsum(T, T, format="csr")
+
+# Right-hand side: boundary temperatures moved to b for the nodes next to each edge
+def build_rhs(n=n, top=top, bottom=bottom, left=left, right=right):
+    inner_n = n - 2
+    b = np.zeros((inner_n, inner_n))
+    b[0, :] -= top
+    b[-1, :] -= bottom
+    b[:, 0] -= left
+    b[:, -1] -= right
+    return b.ravel()
+
 # Create sparse matrix A and vector b for Ax = b
-A = lil_matrix((N, N))
-b = np.zeros(N)
-
-# converting (i, j) in 2D to 1D index in x
-def idx(i, j):
-    return i * inner_n + j
-
-# Building the equation system for each inner node
-for i in range(inner_n):
-    for j in range(inner_n):
-        k = idx(i, j)
-        A[k, k] = -4  # center point
-
-        # Top neighbor
-        if i > 0:
-            A[k, idx(i - 1, j)] = 1
-        else:
-            b[k] -= top  # top boundary
+def build_system(n=n, top=top, bottom=bottom, left=left, right=right):
+    return build_matrix(n), build_rhs(n, top, bottom, left, right)
 
-        # Bottom neighbor
-        if i < inner_n - 1:
-            A[k, idx(i + 1, j)] = 1
-        else:
-            b[k] -= bottom  # bottom boundary
+# A only depends on the grid size, so its LU factorization is computed once
+# per n and kept for the most recently used sizes (_factorization.cache_clear()
+# frees them), together with the time spent assembling and factorizing A
+@lru_cache(maxsize=4)
+def _factorization(n):
+    from scipy.sparse.linalg import splu
 
-        # Left neighbor
-        if j > 0:
-            A[k, idx(i, j - 1)] = 1
-        else:
-            b[k] -= left  # left boundary
+    start = perf_counter()
+    A = build_matrix(n).tocsc()
+    assembled = perf_counter()
+    lu = splu(A)
+    return lu, {"assembly": assembled - start, "factorization": perf_counter() - assembled}
 
-        # Right neighbor
-        if j < inner_n - 1:
-            A[k, idx(i, j + 1)] = 1
-        else:
-            b[k] -= right  # right boundary
+def factorized_matrix(n=n):
+    return _factorization(n)[0]
+
+# Insert the inner solution(s) into full grid(s) and apply the boundary
+# temperatures; with a batch the temperatures are arrays, one per grid
+def _full_grid(temperature, n, top, bottom, left, right):
+    full_temp = np.zeros(temperature.shape[:-2] + (n, n))
+    full_temp[..., 1:-1, 1:-1] = temperature
+    full_temp[..., 0, :] = np.asarray(top)[..., np.newaxis]       # top row
+    full_temp[..., -1, :] = np.asarray(bottom)[..., np.newaxis]   # bottom row
+    full_temp[..., :, 0] = np.asarray(left)[..., np.newaxis]      # left column
+    full_temp[..., :, -1] = np.asarray(right)[..., np.newaxis]    # right column
+    return full_temp
+
+def solve_plate_batch(scenarios, n=n):
+    """Solve many boundary-temperature scenarios on the same plate.
+
+    scenarios has one row (top, bottom, left, right) per scenario. b is
+    linear in the four temperatures, so all right-hand sides form one
+    (N, k) matrix that is solved with the cached factorization of A.
+    Returns an array of shape (k, n, n).
+    """
+    scenarios = np.atleast_2d(np.asarray(scenarios, dtype=float))
+    inner_n = n - 2
+    # One column of b per unit boundary temperature
+    basis = np.stack([build_rhs(n, *unit) for unit in np.eye(4)], axis=1)
+    x = factorized_matrix(n).solve(basis @ scenarios.T)
+    temperature = x.T.reshape(-1, inner_n, inner_n)
+    return _full_grid(temperature, n, *scenarios.T)
+
+def solve_plate(n=n, top=top, bottom=bottom, left=left, right=right, timings=None,
+                method="direct", x0=None, tol=1e-8, maxiter=None, history=None):
+    """Temperature of the whole plate (boundaries included) as an (n, n) grid.
+
+    method is "direct" (spsolve) or one of the iterative solvers in
+    plate_solvers.SOLVERS ("cg", "sor", "multigrid", "mgcg"). Those stop at
+    a relative residual of tol, start from x0 (e.g. a previous full_temp)
+    and append their residual history to the list history, if given.
+    timings, if given, is a dict that receives the assembly and solve
+    times in seconds. For "direct" it also gets the factorization time;
+    A is only assembled and factorized on the first solve for a grid size,
+    so later solves report a factorization time of 0 and only building b
+    as assembly.
+    """
+    inner_n = n - 2
+    factorization = 0.0
+    start = perf_counter()
+    if method == "direct":
+        # The factorization is reused by later solves on the same grid
+        misses = _factorization.cache_info().misses
+        lu, matrix_timings = _factorization(n)
+        b = build_rhs(n, top, bottom, left, right)
+        assembled = perf_counter()
+        if _factorization.cache_info().misses > misses:
+            factorization = matrix_timings["factorization"]
+        x = lu.solve(b)
+    else:
+        from plate_solvers import SOLVERS
 
-x = spsolve(A.tocsr(), b)
+        if method not in SOLVERS:
+            raise ValueError(f"Unknown method {method!r}, expected 'direct' or one of {sorted(SOLVERS)}")
+        f = -build_rhs(n, top, bottom, left, right).reshape(inner_n, inner_n)
+        guess = None if x0 is None else np.asarray(x0, dtype=float)[1:-1, 1:-1]
+        assembled = perf_counter()
+        x, residuals = SOLVERS[method](f, guess, tol=tol, maxiter=maxiter)
+        if history is not None:
+            history.extend(residuals)
+    if timings is not None:
+        # Building A and b is assembly, factorizing A is reported separately
+        timings["assembly"] = assembled - start - factorization
+        if method == "direct":
+            timings["factorization"] = factorization
+        timings["solve"] = perf_counter() - assembled
 
-# Reshaping the solution to 2D array
-temperature = x.reshape((inner_n, inner_n))  # shape: (39, 39)
+    # Reshaping the solution to 2D array and adding the boundaries
+    temperature = x.reshape((inner_n, inner_n))  # shape: (39, 39)
+    return _full_grid(temperature, n, top, bottom, left, right)
 
-# Creating full temperature grid (41x41) including boundaries
-full_temp = np.zeros((n, n))
-full_temp[1:-1, 1:-1] = temperature
+# Transient heat equation dT/dt = diffusivity * laplacian(T) on the same
+# grid and boundaries, with spacing h = length / (n - 1). With A and b from
+# build_system this reads du/dt = (diffusivity / h^2) (A u - b), and the
+# theta-method with r = diffusivity dt / h^2 gives
+#   (I - theta r A) u_new = (I + (1 - theta) r A) u - r b
+# theta = 1 is backward Euler, theta = 1/2 Crank-Nicolson.
+SCHEMES = {"backward_euler": 1.0, "crank_nicolson": 0.5}
 
-# Applying  boundary temperatures
-full_temp[0, :] = top       # top row
-full_temp[-1, :] = bottom   # bottom row
-full_temp[:, 0] = left      # left column
-full_temp[:, -1] = right    # right column
+def solve_transient(n=n, top=top, bottom=bottom, left=left, right=right, initial=0.0,
+                    dt=1e-4, t_end=1.0, scheme="crank_nicolson", diffusivity=1.0, length=1.0,
+                    snapshot_every=100, snapshots=None, steady_tol=1e-6):
+    """Time-dependent plate temperature starting from initial.
+
+    initial is a temperature for all inner nodes or a full (n, n) grid,
+    e.g. a previous steady state for a cool-down. The left-hand operator
+    is factorized once, so every step costs one sparse product and a pair
+    of triangular solves. Every snapshot_every steps the full grid is
+    stored: appended to the file snapshots (see load_snapshots) or kept in
+    memory when no path is given. The run stops early once the largest
+    temperature change per unit time drops below steady_tol.
+    """
+    from scipy.sparse import identity
+    from scipy.sparse.linalg import splu
+
+    theta = SCHEMES[scheme] if isinstance(scheme, str) else float(scheme)
+    inner_n = n - 2
+    r = diffusivity * dt / (length / (n - 1))**2
+    A = build_matrix(n)
+    identity_matrix = identity(A.shape[0], format="csr")
+    lu = splu((identity_matrix - theta * r * A).tocsc())
+    explicit = (identity_matrix + (1 - theta) * r * A).tocsr()
+    forcing = r * build_rhs(n, top, bottom, left, right)
+
+    if np.ndim(initial) == 0:
+        u = np.full(inner_n * inner_n, float(initial))
+    else:
+        u = np.asarray(initial, dtype=float)[1:-1, 1:-1].ravel().copy()
+
+    times = []
+    kept = []
+    stream = open(snapshots, "wb") if snapshots is not None else None
+
+    def snapshot(t):
+        grid = _full_grid(u.reshape(inner_n, inner_n), n, top, bottom, left, right)
+        times.append(t)
+        if stream is None:
+            kept.append(grid)
+        else:
+            np.save(stream, np.array(t))
+            np.save(stream, grid)
+
+    steps = int(round(t_end / dt))
+    step = 0
+    steady = False
+    try:
+        snapshot(0.0)
+        while step < steps and not steady:
+            step += 1
+            new = lu.solve(explicit @ u - forcing)
+            steady = np.max(np.abs(new - u)) / dt < steady_tol
+            u = new
+            if step % snapshot_every == 0 or steady or step == steps:
+                snapshot(step * dt)
+    finally:
+        if stream is not None:
+            stream.close()
+
+    return {
+        "time": np.array(times), "steps": step, "steady": steady,
+        "temperature": _full_grid(u.reshape(inner_n, inner_n), n, top, bottom, left, right),
+        "snapshots": np.array(kept) if stream is None else None,
+    }
+
+def load_snapshots(path):
+    # Snapshot file of solve_transient: repeated (time, grid) records written with np.save
+    times, grids = [], []
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        while f.tell() < size:
+            times.append(float(np.load(f)))
+            grids.append(np.load(f))
+    return np.array(times), np.array(grids)
 
 # Show temperature distribution as heatmap
-plt.figure(figsize=(8, 6))
-plt.imshow(full_temp, origin='lower', cmap='plasma')
-plt.colorbar(label='Temperature (°C)')
-plt.title('Temperature Distribution in the Plate')
-plt.xlabel('x')
-plt.ylabel('y')
-plt.show()
+def plot_temperature(full_temp, save=None):
+    plt = pyplot(save)
+    plt.figure(figsize=(8, 6))
+    plt.imshow(full_temp, origin='lower', cmap='plasma')
+    plt.colorbar(label='Temperature (°C)')
+    plt.title('Temperature Distribution in the Plate')
+    plt.xlabel('x')
+    plt.ylabel('y')
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Steady-state temperature of a square plate.")
+    parser.add_argument("--no-plot", action="store_true", help="only solve the system, do not render anything")
+    parser.add_argument("--save", metavar="PATH", help="write the heatmap to PATH instead of opening a window")
+    parser.add_argument("--n", type=int, default=n, help="grid points per side, including the boundaries")
+    parser.add_argument("--method", choices=["direct", "cg", "sor", "multigrid", "mgcg"], default="direct",
+                        help="sparse direct solve or an iterative solver from plate_solvers.py")
+    parser.add_argument("--tol", type=float, default=1e-8, help="relative residual for the iterative solvers")
+    parser.add_argument("--transient", choices=sorted(SCHEMES),
+                        help="heat-up from 0 degrees with this implicit scheme instead of the steady state")
+    parser.add_argument("--dt", type=float, default=1e-4, help="time step of the transient run")
+    parser.add_argument("--t-end", type=float, default=1.0, help="end time of the transient run")
+    parser.add_argument("--snapshot-every", type=int, default=100, help="steps between stored snapshots")
+    parser.add_argument("--snapshots", metavar="PATH", help="stream the transient snapshots to this file")
+    args = parser.parse_args(argv)
+
+    if args.transient:
+        run = solve_transient(args.n, dt=args.dt, t_end=args.t_end, scheme=args.transient,
+                              snapshot_every=args.snapshot_every, snapshots=args.snapshots)
+        state = "steady state" if run["steady"] else "end time"
+        print(f"{run['steps']} steps, {state} reached at t = {run['steps'] * args.dt:g}")
+        if not args.no_plot:
+            plot_temperature(run["temperature"], save=args.save)
+        return run["temperature"]
+
+    timings = {}
+    history = []
+    full_temp = solve_plate(args.n, timings=timings, method=args.method, tol=args.tol, history=history)
+    factorization = f", factorization {timings['factorization']:.3f} s" if "factorization" in timings else ""
+    print(f"assembly {timings['assembly']:.3f} s{factorization}, solve {timings['solve']:.3f} s")
+    if history:
+        print(f"{len(history) - 1} iterations, final relative residual {history[-1]:.2e}")
+    if not args.no_plot:
+        plot_temperature(full_temp, save=args.save)
+    return full_temp
+
+if __name__ == "__main__":
+    main()
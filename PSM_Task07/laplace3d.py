@@ -0,0 +1,124 @@
+import argparse
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from psm_plot import pyplot
+
+from plate_solvers import SOLVERS
+
+# Steady-state temperature of a cubic block with a fixed temperature on each
+# face, the 3D version of the plate in Task07. Axis 0 runs from the top to
+# the bottom face, axis 1 from left to right and axis 2 from front to back.
+# The 7-point Laplacian is never stored: the solvers of plate_solvers.py
+# apply it with slicing, so a solve needs about 3 (SOR) to 8 (MG-CG)
+# grid-sized arrays.
+
+# Grid size (points per side, including the boundary faces)
+n = 41
+
+# Face temperatures
+FACES = {
+    "top": 200,
+    "bottom": -300,
+    "left": -200,
+    "right": 300,
+    "front": 100,
+    "back": -100,
+}
+
+# Right-hand side of -A u = f: each face temperature acts on the inner nodes next to it
+def build_rhs(n=n, faces=FACES):
+    inner_n = n - 2
+    f = np.zeros((inner_n, inner_n, inner_n))
+    f[0, :, :] += faces["top"]
+    f[-1, :, :] += faces["bottom"]
+    f[:, 0, :] += faces["left"]
+    f[:, -1, :] += faces["right"]
+    f[:, :, 0] += faces["front"]
+    f[:, :, -1] += faces["back"]
+    return f
+
+def solve_block(n=n, faces=FACES, method="mgcg", x0=None, tol=1e-8, maxiter=None, history=None):
+    """Temperature of the whole block (faces included) as an (n, n, n) grid.
+
+    method is one of plate_solvers.SOLVERS; x0 (a previous full grid) is
+    used as initial guess and the residual history is appended to the list
+    history, if given.
+    """
+    faces = dict(FACES, **faces)
+    f = build_rhs(n, faces)
+    guess = None if x0 is None else np.asarray(x0, dtype=float)[1:-1, 1:-1, 1:-1]
+    temperature, residuals = SOLVERS[method](f, guess, tol=tol, maxiter=maxiter)
+    if history is not None:
+        history.extend(residuals)
+    del f
+
+    full_temp = np.zeros((n, n, n))
+    full_temp[1:-1, 1:-1, 1:-1] = temperature
+    full_temp[0, :, :] = faces["top"]
+    full_temp[-1, :, :] = faces["bottom"]
+    full_temp[:, 0, :] = faces["left"]
+    full_temp[:, -1, :] = faces["right"]
+    full_temp[:, :, 0] = faces["front"]
+    full_temp[:, :, -1] = faces["back"]
+    return full_temp
+
+# Middle slices through the block
+def plot_temperature(full_temp, save=None):
+    plt = pyplot(save)
+    middle = full_temp.shape[0] // 2
+    slices = [
+        (full_temp[middle, :, :], "Horizontal slice"),
+        (full_temp[:, middle, :], "Vertical slice (left-right)"),
+        (full_temp[:, :, middle], "Vertical slice (front-back)"),
+    ]
+    plt.figure(figsize=(15, 4))
+    for k, (values, title) in enumerate(slices):
+        plt.subplot(1, 3, k + 1)
+        plt.imshow(values, origin='lower', cmap='plasma')
+        plt.colorbar(label='Temperature (°C)')
+        plt.title(title)
+    plt.tight_layout()
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Steady-state temperature of a cubic block.")
+    parser.add_argument("--no-plot", action="store_true", help="only solve, do not render anything")
+    parser.add_argument("--save", metavar="PATH", help="write the slices to PATH instead of opening a window")
+    parser.add_argument("--n", type=int, default=n, help="grid points per side, including the faces")
+    parser.add_argument("--method", choices=sorted(SOLVERS), default="mgcg", help="iterative solver")
+    parser.add_argument("--tol", type=float, default=1e-8, help="relative residual to stop at")
+    parser.add_argument("--face", action="append", default=[], metavar="NAME=T",
+                        help="face temperature, e.g. top=150; can be repeated")
+    args = parser.parse_args(argv)
+
+    faces = {}
+    for item in args.face:
+        name, value = item.split("=")
+        if name not in FACES:
+            parser.error(f"unknown face {name!r}, expected one of {', '.join(FACES)}")
+        faces[name] = float(value)
+
+    # NumPy reports its allocations to tracemalloc, so the peak covers every grid copy
+    history = []
+    tracemalloc.start()
+    start = perf_counter()
+    full_temp = solve_block(args.n, faces, args.method, tol=args.tol, history=history)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{(args.n - 2)**3} unknowns: {len(history) - 1} iterations, residual {history[-1]:.2e}, "
+          f"solve {elapsed:.2f} s, peak memory {peak / 2**20:.0f} MB "
+          f"({peak / full_temp.nbytes:.1f} grid copies)")
+    if not args.no_plot:
+        plot_temperature(full_temp, save=args.save)
+    return full_temp
+
+if __name__ == "__main__":
+    main()
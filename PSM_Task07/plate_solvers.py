@@ -0,0 +1,236 @@
+import numpy as np
+
+# Iterative solvers for the plate system of Task07. They work on the inner
+# nodes as an array u and solve the SPD form of the equations,
+# -A u = f with f = -b, i.e. 4 u[i, j] - (sum of the four neighbours) = f[i, j],
+# where nodes outside the inner grid count as zero (their temperatures are
+# already part of f). Nothing is specific to 2D: for a 3D block u has three
+# axes and the stencil becomes 6 u - (six neighbours), see laplace3d.py.
+# Every solver takes (f, x0=None, tol, maxiter) and returns (u, history),
+# history being the relative residual ||f + A u|| / ||f|| after every
+# iteration (entry 0 is the initial guess).
+
+def _cut(axis, start, stop, step=None):
+    return (slice(None),) * axis + (slice(start, stop, step),)
+
+# SPD operator -A applied without a matrix
+def apply_operator(u, out=None):
+    if out is None:
+        out = np.empty_like(u)
+    np.multiply(u, 2 * u.ndim, out=out)
+    for axis in range(u.ndim):
+        out[_cut(axis, 1, None)] -= u[_cut(axis, None, -1)]
+        out[_cut(axis, None, -1)] -= u[_cut(axis, 1, None)]
+    return out
+
+def _relative_residual(f, u, fnorm):
+    residual = apply_operator(u)
+    np.subtract(f, residual, out=residual)
+    return np.linalg.norm(residual) / fnorm
+
+def _norm_or_one(f):
+    fnorm = np.linalg.norm(f)
+    return fnorm if fnorm > 0 else 1.0
+
+# Conjugate gradient
+def pcg(apply_A, b, x0=None, precond=None, tol=1e-8, maxiter=1000):
+    """Preconditioned conjugate gradient for an SPD operator.
+
+    apply_A(x) and precond(r) are callables on arrays shaped like b (any
+    number of dimensions), so the same code serves 2D and 3D grids and
+    matrix-free operators. Stops when ||r|| / ||b|| <= tol.
+    """
+    x = np.zeros_like(b) if x0 is None else np.array(x0, dtype=float)
+    r = b - apply_A(x)
+    bnorm = _norm_or_one(b)
+    history = [np.linalg.norm(r) / bnorm]
+    if history[-1] <= tol:
+        return x, history
+    z = r if precond is None else precond(r)
+    p = np.array(z)
+    rz = np.vdot(r, z)
+    for _ in range(maxiter):
+        Ap = apply_A(p)
+        alpha = rz / np.vdot(p, Ap)
+        # The updates are scaled in the memory of Ap instead of in new temporaries
+        np.multiply(Ap, alpha, out=Ap)
+        r -= Ap
+        np.multiply(p, alpha, out=Ap)
+        x += Ap
+        history.append(np.linalg.norm(r) / bnorm)
+        if history[-1] <= tol:
+            break
+        # Drop the old arrays first so the preconditioner can reuse their memory
+        del Ap, z
+        z = r if precond is None else precond(r)
+        rz_new = np.vdot(r, z)
+        p *= rz_new / rz
+        p += z
+        rz = rz_new
+    return x, history
+
+def solve_cg(f, x0=None, tol=1e-8, maxiter=None):
+    maxiter = maxiter or 10 * f.size
+    return pcg(apply_operator, f, x0, None, tol, maxiter)
+
+# Red-black relaxation
+# u is padded with a zero border, so u[1:-1, 1:-1] are the inner nodes. A
+# colour is split into strided sub-lattices, one per combination of index
+# parities (red: even parity sum), whose neighbours all have the other
+# colour, so each update is a handful of slice operations.
+def colours(ndim):
+    parities = np.indices((2,) * ndim).reshape(ndim, -1).T
+    red = [tuple(p) for p in parities if p.sum() % 2 == 0]
+    black = [tuple(p) for p in parities if p.sum() % 2 == 1]
+    return red, black
+
+def _relax(u, f, omega, sublattices):
+    for parity in sublattices:
+        center_index = tuple(slice(1 + p, m + 1, 2) for p, m in zip(parity, f.shape))
+        center = u[center_index]
+        total = f[tuple(slice(p, None, 2) for p in parity)].copy()
+        for axis in range(f.ndim):
+            p, m = parity[axis], f.shape[axis]
+            for shift in (-1, 1):
+                index = list(center_index)
+                index[axis] = slice(1 + p + shift, m + 1 + shift, 2)
+                total += u[tuple(index)]
+        if omega == 1:
+            np.multiply(total, 1 / (2 * f.ndim), out=center)
+        else:
+            center *= 1 - omega
+            center += (omega / (2 * f.ndim)) * total
+
+def _inner(u):
+    return u[(slice(1, -1),) * u.ndim]
+
+def _padded(f, x0):
+    u = np.zeros(tuple(m + 2 for m in f.shape))
+    if x0 is not None:
+        _inner(u)[...] = x0
+    return u
+
+def solve_sor(f, x0=None, tol=1e-8, maxiter=None, omega=None):
+    # Red-black SOR; the default omega is optimal for the square model problem (omega=1: Gauss-Seidel)
+    if omega is None:
+        omega = 2 / (1 + np.sin(np.pi / (max(f.shape) + 1)))
+    maxiter = maxiter or 100 * max(f.shape)
+    red, black = colours(f.ndim)
+    u = _padded(f, x0)
+    fnorm = _norm_or_one(f)
+    history = [_relative_residual(f, _inner(u), fnorm)]
+    while history[-1] > tol and len(history) <= maxiter:
+        _relax(u, f, omega, red)
+        _relax(u, f, omega, black)
+        history.append(_relative_residual(f, _inner(u), fnorm))
+    return _inner(u).copy(), history
+
+# Geometric multigrid
+# Grids with m inner nodes along every axis are coarsened to (m - 1) // 2.
+# Prolongation is linear interpolation along each axis between the node
+# positions of both grids (standard for m = 2 mc + 1), restriction its
+# transpose normalized to unit row sums. The coarse equations use the same
+# stencil, so the restricted residual is scaled by (H / h)^2.
+def _interpolation(m, mc):
+    from scipy.sparse import csr_matrix
+
+    # Inner fine node i sits at (i + 1) / (m + 1), coarse node J at J / (mc + 1)
+    position = (np.arange(m) + 1) * (mc + 1)
+    J = position // (m + 1)
+    w = (position % (m + 1)) / (m + 1)
+    rows = np.concatenate([np.arange(m), np.arange(m)])
+    cols = np.concatenate([J, J + 1]) - 1
+    vals = np.concatenate([1 - w, w])
+    # Coarse boundary nodes (0 and mc + 1) hold zero corrections
+    keep = (cols >= 0) & (cols < mc) & (vals != 0)
+    return csr_matrix((vals[keep], (rows[keep], cols[keep])), shape=(m, mc))
+
+def _along_axes(M, x):
+    # Apply the 1D operator M along every axis of x
+    for axis in range(x.ndim):
+        moved = np.moveaxis(x, axis, 0)
+        result = M @ moved.reshape(moved.shape[0], -1)
+        x = np.moveaxis(result.reshape((M.shape[0],) + moved.shape[1:]), 0, axis)
+    return x
+
+def build_hierarchy(shape, coarsest=3):
+    if len(set(shape)) != 1:
+        raise ValueError(f"multigrid needs the same number of nodes along every axis, got {shape}")
+    m, ndim = shape[0], len(shape)
+    levels = []
+    while True:
+        level = {"m": m}
+        levels.append(level)
+        if m <= coarsest:
+            # Small enough for a dense inverse of sum_axis (I x .. x T x .. x I)
+            T = 2 * np.eye(m) - np.eye(m, k=1) - np.eye(m, k=-1)
+            K = np.zeros((m**ndim, m**ndim))
+            for axis in range(ndim):
+                term = np.ones((1, 1))
+                for other in range(ndim):
+                    term = np.kron(term, T if other == axis else np.eye(m))
+                K += term
+            level["inverse"] = np.linalg.inv(K)
+            return levels
+        mc = (m - 1) // 2
+        P = _interpolation(m, mc)
+        R = P.T.tocsr()
+        R = R.multiply(1 / np.asarray(R.sum(axis=1))).tocsr()
+        level.update(P=P, R=R, scale=((m + 1) / (mc + 1))**2)
+        m = mc
+
+def v_cycle(levels, u, f, pre=2, post=2, k=0):
+    """One V-cycle on level k for -A u = f; u is padded and updated in place.
+
+    Pre-smoothing runs red then black and post-smoothing the reverse, so the
+    cycle is a symmetric operator and can precondition CG.
+    """
+    level = levels[k]
+    if "inverse" in level:
+        _inner(u)[...] = (level["inverse"] @ f.ravel()).reshape(f.shape)
+        return u
+    red, black = colours(f.ndim)
+    for _ in range(pre):
+        _relax(u, f, 1.0, red)
+        _relax(u, f, 1.0, black)
+
+    residual = apply_operator(_inner(u))
+    np.subtract(f, residual, out=residual)
+    coarse_f = level["scale"] * _along_axes(level["R"], residual)
+    del residual
+    coarse_u = _padded(coarse_f, None)
+    v_cycle(levels, coarse_u, coarse_f, pre, post, k + 1)
+    _inner(u)[...] += _along_axes(level["P"], _inner(coarse_u))
+
+    for _ in range(post):
+        _relax(u, f, 1.0, black)
+        _relax(u, f, 1.0, red)
+    return u
+
+def solve_multigrid(f, x0=None, tol=1e-8, maxiter=None, pre=2, post=2):
+    # Stand-alone V-cycles
+    levels = build_hierarchy(f.shape)
+    u = _padded(f, x0)
+    fnorm = _norm_or_one(f)
+    history = [_relative_residual(f, _inner(u), fnorm)]
+    while history[-1] > tol and len(history) <= (maxiter or 100):
+        v_cycle(levels, u, f, pre, post)
+        history.append(_relative_residual(f, _inner(u), fnorm))
+    return _inner(u).copy(), history
+
+def solve_mgcg(f, x0=None, tol=1e-8, maxiter=None, pre=1, post=1):
+    # CG preconditioned with one V-cycle (zero initial guess) per iteration
+    levels = build_hierarchy(f.shape)
+
+    def precond(r):
+        return _inner(v_cycle(levels, _padded(r, None), r, pre, post))
+
+    return pcg(apply_operator, f, x0, precond, tol, maxiter or 100)
+
+# Solvers by name, as used by Task07.solve_plate(method=...) and laplace3d.solve_block
+SOLVERS = {
+    "cg": solve_cg,
+    "sor": solve_sor,
+    "multigrid": solve_multigrid,
+    "mgcg": solve_mgcg,
+}
@@ -1,5 +1,10 @@
+import argparse
+import os
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from psm_checkpoint import load_checkpoint, open_history, save_checkpoint
+from psm_plot import pyplot
 
 # Parameters
 A = 10
@@ -14,99 +19,232 @@ n = int((tf - t0) / dt)  # number of steps
 x0, y0, z0 = 1, 1, 1
 
 
-# Lorenz system equations
-def lorenz(x, y, z):
-    dxdt = A * (y - x)
-    dydt = -x * z + B * x - y
-    dzdt = x * y - C * z
+# Lorenz system equations. params = (A, B, C) overrides the module
+# parameters; with arrays x, y, z (one entry per trajectory) the entries of
+# params may be arrays too, one value per trajectory.
+def lorenz(x, y, z, params=None):
+    a, b, c = (A, B, C) if params is None else params
+    dxdt = a * (y - x)
+    dydt = -x * z + b * x - y
+    dzdt = x * y - c * z
     return dxdt, dydt, dzdt
 
 
 # Euler method
-def euler_method():
-    x, y, z = np.zeros(n), np.zeros(n), np.zeros(n)
-    x[0], y[0], z[0] = x0, y0, z0
+def euler_step(x, y, z, params=None):
+    dxdt, dydt, dzdt = lorenz(x, y, z, params)
+    return x + dt * dxdt, y + dt * dydt, z + dt * dzdt
 
-    for i in range(n - 1):
-        dxdt, dydt, dzdt = lorenz(x[i], y[i], z[i])
-        x[i + 1] = x[i] + dt * dxdt
-        y[i + 1] = y[i] + dt * dydt
-        z[i + 1] = z[i] + dt * dzdt
 
-    return x, y, z
+# Midpoint method
+def midpoint_step(x, y, z, params=None):
+    # First step (Euler half-step)
+    kx1, ky1, kz1 = lorenz(x, y, z, params)
+    x_mid = x + 0.5 * dt * kx1
+    y_mid = y + 0.5 * dt * ky1
+    z_mid = z + 0.5 * dt * kz1
 
+    # Second step (using midpoint derivatives)
+    kx2, ky2, kz2 = lorenz(x_mid, y_mid, z_mid, params)
+    return x + dt * kx2, y + dt * ky2, z + dt * kz2
 
-# Midpoint method
-def midpoint_method():
-    x, y, z = np.zeros(n), np.zeros(n), np.zeros(n)
-    x[0], y[0], z[0] = x0, y0, z0
 
-    for i in range(n - 1):
-        # First step (Euler half-step)
-        kx1, ky1, kz1 = lorenz(x[i], y[i], z[i])
-        x_mid = x[i] + 0.5 * dt * kx1
-        y_mid = y[i] + 0.5 * dt * ky1
-        z_mid = z[i] + 0.5 * dt * kz1
+# RK4 method
+def rk4_step(x, y, z, params=None):
+    # Step 1
+    kx1, ky1, kz1 = lorenz(x, y, z, params)
 
-        # Second step (using midpoint derivatives)
-        kx2, ky2, kz2 = lorenz(x_mid, y_mid, z_mid)
-        x[i + 1] = x[i] + dt * kx2
-        y[i + 1] = y[i] + dt * ky2
-        z[i + 1] = z[i] + dt * kz2
+    # Step 2
+    kx2, ky2, kz2 = lorenz(x + 0.5 * dt * kx1, y + 0.5 * dt * ky1, z + 0.5 * dt * kz1, params)
 
-    return x, y, z
+    # Step 3
+    kx3, ky3, kz3 = lorenz(x + 0.5 * dt * kx2, y + 0.5 * dt * ky2, z + 0.5 * dt * kz2, params)
 
+    # Step 4
+    kx4, ky4, kz4 = lorenz(x + dt * kx3, y + dt * ky3, z + dt * kz3, params)
 
-# RK4 method
-def rk4_method():
-    x, y, z = np.zeros(n), np.zeros(n), np.zeros(n)
-    x[0], y[0], z[0] = x0, y0, z0
+    # Update
+    return (x + (dt / 6) * (kx1 + 2 * kx2 + 2 * kx3 + kx4),
+            y + (dt / 6) * (ky1 + 2 * ky2 + 2 * ky3 + ky4),
+            z + (dt / 6) * (kz1 + 2 * kz2 + 2 * kz3 + kz4))
 
-    for i in range(n - 1):
-        # Step 1
-        kx1, ky1, kz1 = lorenz(x[i], y[i], z[i])
 
-        # Step 2
-        kx2, ky2, kz2 = lorenz(x[i] + 0.5 * dt * kx1, y[i] + 0.5 * dt * ky1, z[i] + 0.5 * dt * kz1)
+METHODS = {"euler": euler_step, "midpoint": midpoint_step, "rk4": rk4_step}
 
-        # Step 3
-        kx3, ky3, kz3 = lorenz(x[i] + 0.5 * dt * kx2, y[i] + 0.5 * dt * ky2, z[i] + 0.5 * dt * kz2)
 
-        # Step 4
-        kx4, ky4, kz4 = lorenz(x[i] + dt * kx3, y[i] + dt * ky3, z[i] + dt * kz3)
+def integrate(method, checkpoint=None, checkpoint_every=10000, resume=False):
+    """Integrate the Lorenz system with one of METHODS and return x, y, z.
 
-        # Update
-        x[i + 1] = x[i] + (dt / 6) * (kx1 + 2 * kx2 + 2 * kx3 + kx4)
-        y[i + 1] = y[i] + (dt / 6) * (ky1 + 2 * ky2 + 2 * ky3 + ky4)
-        z[i + 1] = z[i] + (dt / 6) * (kz1 + 2 * kz2 + 2 * kz3 + kz4)
+    With a checkpoint path the current point is saved every
+    checkpoint_every steps and the trajectory is kept in a memory-mapped
+    history file next to it; resume=True continues bit-identically.
+    """
+    step = METHODS[method]
+    resuming = checkpoint is not None and resume and os.path.exists(checkpoint)
+    history = None
+    if checkpoint is None:
+        x, y, z = np.zeros(n), np.zeros(n), np.zeros(n)
+    else:
+        history = open_history(checkpoint, n, {"x": (), "y": (), "z": ()}, resuming)
+        x, y, z = history["x"], history["y"], history["z"]
+    x[0], y[0], z[0] = x0, y0, z0
 
+    params = {"method": method, "A": A, "B": B, "C": C, "dt": dt, "n": n, "x0": x0, "y0": y0, "z0": z0}
+    first = 0
+    xi, yi, zi = x0, y0, z0
+    if resuming:
+        first, state = load_checkpoint(checkpoint, params)
+        xi, yi, zi = (float(value) for value in state["point"])
+
+    for i in range(first, n - 1):
+        xi, yi, zi = step(xi, yi, zi)
+        x[i + 1], y[i + 1], z[i + 1] = xi, yi, zi
+        if checkpoint is not None and (i + 1) % checkpoint_every == 0:
+            save_checkpoint(checkpoint, i + 1, {"point": np.array([xi, yi, zi])}, params, history)
+
+    if history is not None:
+        history.flush()
     return x, y, z
 
 
-x_e, y_e, z_e = euler_method()
-x_m, y_m, z_m = midpoint_method()
-x_r, y_r, z_r = rk4_method()
-
-# Plot z vs x for all methods
-plt.figure(figsize=(12, 8))
+def euler_method():
+    return integrate("euler")
 
-plt.subplot(3, 1, 1)
-plt.plot(x_e, z_e, 'b', linewidth=0.5)
-plt.title('Euler Method: z vs x')
-plt.xlabel('x')
-plt.ylabel('z')
 
-plt.subplot(3, 1, 2)
-plt.plot(x_m, z_m, 'r', linewidth=0.5)
-plt.title('Midpoint Method: z vs x')
-plt.xlabel('x')
-plt.ylabel('z')
+def midpoint_method():
+    return integrate("midpoint")
 
-plt.subplot(3, 1, 3)
-plt.plot(x_r, z_r, 'g', linewidth=0.5)
-plt.title('RK4 Method: z vs x')
-plt.xlabel('x')
-plt.ylabel('z')
 
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+def rk4_method():
+    return integrate("rk4")
+
+
+# Ensembles
+# M trajectories are integrated together: the state is an (M, 3) array and
+# each step evaluates the right-hand side for the whole batch at once. The
+# operations are the same as in the scalar loop, so a one-member batch
+# reproduces integrate() exactly.
+def integrate_ensemble(method, initial, params=None, steps=n, record_every=1):
+    """Integrate M initial conditions (an (M, 3) array) with one of METHODS.
+
+    params is None (module A, B, C) or a tuple (A, B, C) whose entries are
+    scalars or (M,) arrays. Every record_every-th state is kept; the result
+    has shape ((steps - 1) // record_every + 1, M, 3).
+    """
+    step = METHODS[method]
+    state = np.array(initial, dtype=float).reshape(-1, 3)
+    if params is not None:
+        params = tuple(np.asarray(p, dtype=float) for p in params)
+    trajectory = np.empty(((steps - 1) // record_every + 1,) + state.shape)
+    trajectory[0] = state
+
+    x, y, z = state[:, 0].copy(), state[:, 1].copy(), state[:, 2].copy()
+    for i in range(1, steps):
+        x, y, z = step(x, y, z, params)
+        if i % record_every == 0:
+            state[:, 0], state[:, 1], state[:, 2] = x, y, z
+            trajectory[i // record_every] = state
+    return trajectory
+
+
+def euler_ensemble(initial, params=None, steps=n, record_every=1):
+    return integrate_ensemble("euler", initial, params, steps, record_every)
+
+
+def midpoint_ensemble(initial, params=None, steps=n, record_every=1):
+    return integrate_ensemble("midpoint", initial, params, steps, record_every)
+
+
+def rk4_ensemble(initial, params=None, steps=n, record_every=1):
+    return integrate_ensemble("rk4", initial, params, steps, record_every)
+
+
+def perturbed_initial(members, scale=1e-8, seed=None):
+    # (x0, y0, z0) plus Gaussian perturbations of the given size, one row per member
+    rng = np.random.default_rng(seed)
+    return np.array([x0, y0, z0], dtype=float) + scale * rng.standard_normal((members, 3))
+
+
+def run_simulation(checkpoint=None, checkpoint_every=10000, resume=False):
+    # Each method gets its own checkpoint file: state.npz -> state_euler.npz, ...
+    results = {}
+    for method in METHODS:
+        path = None
+        if checkpoint is not None:
+            root, ext = os.path.splitext(checkpoint)
+            path = f"{root}_{method}{ext or '.npz'}"
+        results[method] = integrate(method, path, checkpoint_every, resume)
+    return results
+
+
+# Plot z vs x for all methods. render="density" or "lttb" draws through
+# lorenz_render.py, which stays fast for very long trajectories.
+def plot_results(results, save=None, render="lines"):
+    if render != "lines":
+        from lorenz_render import plot_rendered
+        return plot_rendered(results, render, save)
+
+    plt = pyplot(save)
+    x_e, y_e, z_e = results["euler"]
+    x_m, y_m, z_m = results["midpoint"]
+    x_r, y_r, z_r = results["rk4"]
+
+    plt.figure(figsize=(12, 8))
+
+    plt.subplot(3, 1, 1)
+    plt.plot(x_e, z_e, 'b', linewidth=0.5)
+    plt.title('Euler Method: z vs x')
+    plt.xlabel('x')
+    plt.ylabel('z')
+
+    plt.subplot(3, 1, 2)
+    plt.plot(x_m, z_m, 'r', linewidth=0.5)
+    plt.title('Midpoint Method: z vs x')
+    plt.xlabel('x')
+    plt.ylabel('z')
+
+    plt.subplot(3, 1, 3)
+    plt.plot(x_r, z_r, 'g', linewidth=0.5)
+    plt.title('RK4 Method: z vs x')
+    plt.xlabel('x')
+    plt.ylabel('z')
+
+    plt.tight_layout()
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lorenz system with Euler, Midpoint and RK4.")
+    parser.add_argument("--no-plot", action="store_true", help="only integrate, do not render anything")
+    parser.add_argument("--save", metavar="PATH", help="write the figure to PATH instead of opening a window")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="periodically save each trajectory to files derived from PATH")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="steps between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="continue from the files given by --checkpoint")
+    parser.add_argument("--render", choices=["lines", "density", "lttb"], default="lines",
+                        help="draw every point, a density image or an LTTB-downsampled line")
+    parser.add_argument("--ensemble", type=int, metavar="M",
+                        help="integrate M perturbed copies of (x0, y0, z0) with RK4 and report their spread")
+    parser.add_argument("--perturbation", type=float, default=1e-8, help="size of the ensemble perturbations")
+    args = parser.parse_args(argv)
+
+    if args.ensemble:
+        trajectory = rk4_ensemble(perturbed_initial(args.ensemble, args.perturbation, seed=0),
+                                  record_every=max(1, n // 100))
+        spread = np.linalg.norm(trajectory - trajectory.mean(axis=1, keepdims=True), axis=2).max(axis=1)
+        for k in range(0, len(spread), 10):
+            print(f"t = {k * max(1, n // 100) * dt:7.2f}: max distance from ensemble mean {spread[k]:.3e}")
+        return trajectory
+
+    results = run_simulation(args.checkpoint, args.checkpoint_every, args.resume)
+    if not args.no_plot:
+        plot_results(results, save=args.save, render=args.render)
+    return results
+
+
+if __name__ == "__main__":
+    main()
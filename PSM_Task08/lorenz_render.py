@@ -0,0 +1,242 @@
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from psm_plot import pyplot
+
+from Task08 import METHODS, dt, n, x0, y0, z0
+
+# Rendering for long Lorenz trajectories. Instead of handing every point to
+# plt.plot, the trajectory is produced in fixed-size blocks and each block
+# is either binned into a density image or thinned with LTTB, so time and
+# memory for drawing do not grow with the trajectory length.
+
+AXES = {"x": 0, "y": 1, "z": 2}
+COLORS = {"euler": "b", "midpoint": "r", "rk4": "g"}
+
+
+def trajectory_chunks(method="rk4", steps=n, initial=(x0, y0, z0), params=None, chunk=65536):
+    """Integrate with one of Task08.METHODS and yield blocks of shape (k, M, 3).
+
+    initial holds M starting points ((3,) or (M, 3)). The same buffer is
+    reused for every block, so each block is only valid until the next one
+    is requested; memory stays at one block whatever the number of steps.
+    """
+    step = METHODS[method]
+    state = np.array(initial, dtype=float).reshape(-1, 3)
+    if len(state) == 1:
+        # Plain floats are the fastest way to step a single trajectory
+        x, y, z = (float(value) for value in state[0])
+    else:
+        x, y, z = state[:, 0].copy(), state[:, 1].copy(), state[:, 2].copy()
+
+    buffer = np.empty((chunk,) + state.shape)
+    buffer[0] = state
+    filled = 1
+    for _ in range(1, steps):
+        x, y, z = step(x, y, z, params)
+        row = buffer[filled]
+        row[:, 0] = x
+        row[:, 1] = y
+        row[:, 2] = z
+        filled += 1
+        if filled == chunk:
+            yield buffer
+            filled = 0
+    if filled:
+        yield buffer[:filled]
+
+
+class DensityImage:
+    """Fixed-resolution 2D histogram of trajectory points in the plane of two axes.
+
+    bounds is ((low, high), (low, high)) for the two axes; if None it is
+    taken from the first block with a 10% margin. Points outside the bounds
+    or not finite are counted in `outside` instead of the image.
+    """
+
+    def __init__(self, resolution=(800, 800), axes=("x", "z"), bounds=None):
+        self.resolution = resolution
+        self.axes = tuple(AXES[a] if isinstance(a, str) else a for a in axes)
+        self.bounds = bounds
+        self.counts = np.zeros(resolution[0] * resolution[1], dtype=np.int64)
+        self.outside = 0
+
+    def add(self, points):
+        points = np.asarray(points).reshape(-1, 3)
+        u = points[:, self.axes[0]]
+        v = points[:, self.axes[1]]
+        finite = np.isfinite(u) & np.isfinite(v)
+        if self.bounds is None:
+            if not finite.any():
+                self.outside += len(points)
+                return
+            bounds = []
+            for values in (u[finite], v[finite]):
+                low, high = values.min(), values.max()
+                margin = 0.1 * (high - low) or 1.0
+                bounds.append((low - margin, high + margin))
+            self.bounds = tuple(bounds)
+
+        (u0, u1), (v0, v1) = self.bounds
+        nu, nv = self.resolution
+        iu = np.floor((u - u0) * (nu / (u1 - u0)))
+        iv = np.floor((v - v0) * (nv / (v1 - v0)))
+        inside = finite & (iu >= 0) & (iu < nu) & (iv >= 0) & (iv < nv)
+        self.outside += len(points) - np.count_nonzero(inside)
+        cells = iu[inside].astype(np.int64) * nv + iv[inside].astype(np.int64)
+        self.counts += np.bincount(cells, minlength=nu * nv)
+
+    def image(self):
+        # Counts indexed [u, v]
+        return self.counts.reshape(self.resolution)
+
+
+def lttb(points, n_out):
+    """Largest-Triangle-Three-Buckets: indices of n_out points that keep the shape.
+
+    points is (N, 2): for a time series (t, value), for a phase portrait the
+    two plotted coordinates. The points are split into n_out - 2 buckets in
+    their original order; from each bucket the point spanning the largest
+    triangle with the previously chosen point and the next bucket's mean is
+    kept. The first and last points are always kept.
+    """
+    points = np.asarray(points, dtype=float)
+    N = len(points)
+    if n_out >= N or n_out < 3:
+        return np.arange(N)
+
+    edges = (np.arange(n_out - 1) * ((N - 2) / (n_out - 2))).astype(int) + 1
+    edges[-1] = N - 1
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = N - 1
+    previous = points[0]
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            following = points[edges[b + 1]:edges[b + 2]].mean(axis=0)
+        else:
+            following = points[-1]
+        candidates = points[lo:hi]
+        area = np.abs((previous[0] - following[0]) * (candidates[:, 1] - previous[1])
+                      - (previous[0] - candidates[:, 0]) * (following[1] - previous[1]))
+        k = lo + int(np.argmax(area))
+        selected[b + 1] = k
+        previous = points[k]
+    return selected
+
+
+def lttb_chunks(chunks, n_out, total, axes=("x", "z"), member=0):
+    """Shape-preserving downsampling of a streamed trajectory to about n_out points.
+
+    Every block gets a share of n_out proportional to its length (total is
+    the number of points in the whole trajectory) and is thinned with LTTB
+    in the plane of the two axes. Returns an (about n_out, 3) array.
+    """
+    ia, ib = (AXES[a] if isinstance(a, str) else a for a in axes)
+    kept = []
+    for block in chunks:
+        points = block[:, member]
+        points = points[np.isfinite(points).all(axis=1)]
+        share = max(3, int(round(n_out * len(block) / total)))
+        kept.append(points[lttb(points[:, [ia, ib]], share)])
+    return np.concatenate(kept) if kept else np.zeros((0, 3))
+
+
+def _show_density(plt, density, title, axes):
+    (u0, u1), (v0, v1) = density.bounds
+    plt.imshow(np.log1p(density.image()).T, origin='lower', extent=(u0, u1, v0, v1),
+               aspect='auto', cmap='magma')
+    plt.title(title)
+    plt.xlabel(axes[0])
+    plt.ylabel(axes[1])
+
+
+def plot_rendered(results, mode="density", save=None, axes=("x", "z"), resolution=(600, 400), n_out=5000):
+    """Task08.plot_results for long trajectories: one panel per method.
+
+    results maps a method name to its (x, y, z) arrays; mode is "density"
+    or "lttb".
+    """
+    plt = pyplot(save)
+    plt.figure(figsize=(12, 8))
+    for k, (method, (x, y, z)) in enumerate(results.items()):
+        plt.subplot(len(results), 1, k + 1)
+        points = np.stack([x, y, z], axis=1)[:, np.newaxis]
+        title = f'{method.capitalize()} Method: {axes[1]} vs {axes[0]}'
+        if mode == "density":
+            density = DensityImage(resolution, axes)
+            density.add(points)
+            if density.bounds is not None:
+                _show_density(plt, density, title, axes)
+        else:
+            thinned = lttb_chunks([points], n_out, len(points), axes)
+            plt.plot(thinned[:, AXES[axes[0]]], thinned[:, AXES[axes[1]]],
+                     COLORS.get(method, 'k'), linewidth=0.5)
+            plt.title(title)
+            plt.xlabel(axes[0])
+            plt.ylabel(axes[1])
+    plt.tight_layout()
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+
+def render(method="rk4", steps=n, mode="density", axes=("x", "z"), resolution=(800, 800), n_out=5000,
+           chunk=65536, save=None, draw=True):
+    # Stream one trajectory straight from the integrator into the chosen renderer
+    chunks = trajectory_chunks(method, steps, chunk=chunk)
+    if mode == "density":
+        result = DensityImage(resolution, axes)
+        for block in chunks:
+            result.add(block)
+    else:
+        result = lttb_chunks(chunks, n_out, steps, axes)
+    if not draw:
+        return result
+
+    plt = pyplot(save)
+    plt.figure(figsize=(8, 8))
+    title = f'{method.capitalize()} Method: {axes[1]} vs {axes[0]} ({steps} steps)'
+    if mode == "density":
+        _show_density(plt, result, title, axes)
+    else:
+        plt.plot(result[:, AXES[axes[0]]], result[:, AXES[axes[1]]], COLORS.get(method, 'k'), linewidth=0.5)
+        plt.title(title)
+        plt.xlabel(axes[0])
+        plt.ylabel(axes[1])
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render long Lorenz trajectories as density images or LTTB lines.")
+    parser.add_argument("--method", choices=sorted(METHODS), default="rk4", help="integration method")
+    parser.add_argument("--tf", type=float, default=n * dt, help="final time")
+    parser.add_argument("--mode", choices=["density", "lttb"], default="density", help="rendering mode")
+    parser.add_argument("--axes", default="x,z", help="plotted plane, e.g. 'x,z'")
+    parser.add_argument("--resolution", type=int, nargs=2, default=[800, 800], help="density image size")
+    parser.add_argument("--points", type=int, default=5000, help="points kept by LTTB")
+    parser.add_argument("--chunk", type=int, default=65536, help="trajectory points per block")
+    parser.add_argument("--no-plot", action="store_true", help="only integrate and bin, do not draw")
+    parser.add_argument("--save", metavar="PATH", help="write the figure to PATH instead of opening a window")
+    args = parser.parse_args(argv)
+
+    steps = int(args.tf / dt)
+    start = perf_counter()
+    result = render(args.method, steps, args.mode, tuple(args.axes.split(",")), tuple(args.resolution),
+                    args.points, args.chunk, args.save, draw=not args.no_plot)
+    print(f"{steps} points rendered in {perf_counter() - start:.2f} s")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from psm_plot import pyplot
+
+from Task08 import A, C, lorenz, x0, y0, z0
+
+# Sweep of the Lorenz parameters: largest Lyapunov exponent, attractor
+# statistics and the local maxima of z (for a bifurcation diagram) at every
+# grid point. A block of grid points is integrated as one ensemble with
+# per-member (A, B, C), blocks run in a process pool.
+
+PARAMETERS = ("A", "B", "C")
+
+# One row per parameter point: its (A, B, C) and what was measured on the attractor
+SWEEP_DTYPE = np.dtype([
+    ("A", float),
+    ("B", float),
+    ("C", float),
+    ("lyapunov", float),
+    ("x_mean", float),
+    ("y_mean", float),
+    ("z_mean", float),
+    ("z_std", float),
+    ("z_min", float),
+    ("z_max", float),
+    ("n_maxima", int),
+])
+
+
+def build_grid(A_values, B_values, C_values):
+    # Every combination of the given values, A varying slowest and C fastest
+    a, b, c = np.meshgrid(A_values, B_values, C_values, indexing="ij")
+    grid = np.zeros(a.size, dtype=SWEEP_DTYPE)
+    grid["A"], grid["B"], grid["C"] = a.ravel(), b.ravel(), c.ravel()
+    return grid
+
+
+# Lorenz system together with a tangent vector (u, v, w) evolving under its
+# Jacobian [[-A, A, 0], [B - z, -1, -x], [y, x, -C]]
+def tangent_rhs(x, y, z, u, v, w, params):
+    a, b, c = params
+    dxdt, dydt, dzdt = lorenz(x, y, z, params)
+    return dxdt, dydt, dzdt, a * (v - u), (b - z) * u - v - x * w, y * u + x * v - c * w
+
+
+def rk4_tangent_step(state, params, h):
+    k1 = tangent_rhs(*state, params)
+    k2 = tangent_rhs(*(s + 0.5 * h * k for s, k in zip(state, k1)), params)
+    k3 = tangent_rhs(*(s + 0.5 * h * k for s, k in zip(state, k2)), params)
+    k4 = tangent_rhs(*(s + h * k for s, k in zip(state, k3)), params)
+    return tuple(s + (h / 6) * (p + 2 * q + 2 * r + t) for s, p, q, r, t in zip(state, k1, k2, k3, k4))
+
+
+def evaluate(points, dt=0.01, t_transient=50.0, t_measure=200.0, renorm_every=10, max_maxima=64):
+    """Attractor data for a block of grid points, integrated together.
+
+    The first t_transient time units are discarded. Over the next t_measure
+    the tangent vector is renormalized every renorm_every steps and the
+    logarithms of its growth are averaged into the largest Lyapunov
+    exponent. Returns the filled-in rows and an array (len(points),
+    max_maxima) of local maxima of z (NaN where there are fewer).
+    """
+    results = points.copy()
+    params = (points["A"], points["B"], points["C"])
+    m = len(points)
+    ones = np.ones(m)
+    state = (x0 * ones, y0 * ones, z0 * ones) + (ones / np.sqrt(3),) * 3
+
+    # Transient: only the trajectory matters, the tangent vector is kept bounded
+    transient_steps = int(round(t_transient / dt))
+    for i in range(transient_steps):
+        state = rk4_tangent_step(state, params, dt)
+        if (i + 1) % renorm_every == 0:
+            norm = np.sqrt(state[3]**2 + state[4]**2 + state[5]**2)
+            state = state[:3] + tuple(s / norm for s in state[3:])
+    # Measuring starts from a unit vector, whatever growth is left over from the transient
+    norm = np.sqrt(state[3]**2 + state[4]**2 + state[5]**2)
+    state = state[:3] + tuple(s / norm for s in state[3:])
+
+    measure_steps = int(round(t_measure / dt))
+    log_growth = np.zeros(m)
+    sums = np.zeros((3, m))
+    z_squares = np.zeros(m)
+    z_min = np.full(m, np.inf)
+    z_max = np.full(m, -np.inf)
+    maxima = np.full((m, max_maxima), np.nan)
+    n_maxima = np.zeros(m, dtype=int)
+    z_before, z_last = np.full(m, np.nan), state[2]
+    rows = np.arange(m)
+
+    for i in range(measure_steps):
+        state = rk4_tangent_step(state, params, dt)
+        x, y, z = state[:3]
+        sums += (x, y, z)
+        z_squares += z**2
+        np.minimum(z_min, z, out=z_min)
+        np.maximum(z_max, z, out=z_max)
+
+        # Local maximum of z at the previous sample, refined with a parabola through three samples
+        peak = (z_last > z_before) & (z_last >= z)
+        if peak.any():
+            curvature = z_before[peak] - 2 * z_last[peak] + z[peak]
+            slope = z[peak] - z_before[peak]
+            value = z_last[peak] - slope**2 / (8 * np.where(curvature < 0, curvature, -np.inf))
+            slot = n_maxima[peak]
+            keep = slot < max_maxima
+            maxima[rows[peak][keep], slot[keep]] = value[keep]
+            n_maxima[peak] += 1
+        z_before, z_last = z_last, z
+
+        if (i + 1) % renorm_every == 0 or i + 1 == measure_steps:
+            norm = np.sqrt(state[3]**2 + state[4]**2 + state[5]**2)
+            log_growth += np.log(norm)
+            state = state[:3] + tuple(s / norm for s in state[3:])
+
+    results["lyapunov"] = log_growth / (measure_steps * dt)
+    results["x_mean"], results["y_mean"], results["z_mean"] = sums / measure_steps
+    results["z_std"] = np.sqrt(np.maximum(z_squares / measure_steps - results["z_mean"]**2, 0))
+    results["z_min"] = z_min
+    results["z_max"] = z_max
+    results["n_maxima"] = n_maxima
+    return results, maxima
+
+
+# Sweep file
+# A single .npz with the whole table (one array per column), the z maxima, a
+# flag per row telling whether it has been evaluated, and the evaluation
+# options as JSON. It is rewritten after every chunk, to a temporary name
+# first and then renamed, so an interrupted sweep leaves the last complete
+# version behind.
+def save_sweep(path, results, maxima, done, options):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, z_maxima=maxima, done=done, options=json.dumps(options),
+                 **{field: results[field] for field in SWEEP_DTYPE.names})
+    os.replace(tmp, path)
+
+
+def load_sweep(path):
+    # Returns (results, maxima, done, options)
+    with np.load(path) as data:
+        results = np.zeros(len(data["done"]), dtype=SWEEP_DTYPE)
+        for field in SWEEP_DTYPE.names:
+            results[field] = data[field]
+        return results, data["z_maxima"], data["done"], json.loads(str(data["options"]))
+
+
+def run_sweep(grid, path=None, workers=None, chunk_size=1024, dt=0.01, t_transient=50.0, t_measure=200.0,
+              renorm_every=10, max_maxima=64):
+    """Evaluate every grid point; returns (results, z_maxima) in grid order.
+
+    With a path the sweep is saved after every finished chunk, and a rerun
+    on the same file only evaluates the rows that are not done yet. The file
+    belongs to one grid and one set of options (dt, t_transient, t_measure,
+    renorm_every, max_maxima): resuming with anything else raises ValueError.
+    workers=1 evaluates in-process.
+    """
+    options = {"dt": float(dt), "t_transient": float(t_transient), "t_measure": float(t_measure),
+               "renorm_every": int(renorm_every), "max_maxima": int(max_maxima)}
+    if path is not None and os.path.exists(path):
+        results, maxima, done, stored = load_sweep(path)
+        if stored != options:
+            raise ValueError(f"{path} was computed with {stored}; use another file for {options}")
+        if len(results) != len(grid) or any(not np.array_equal(results[p], grid[p]) for p in PARAMETERS):
+            raise ValueError(f"{path} holds a different parameter grid; use another file")
+    else:
+        results, maxima = grid.copy(), np.full((len(grid), max_maxima), np.nan)
+        done = np.zeros(len(grid), dtype=bool)
+
+    todo = np.flatnonzero(~done)
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+
+    def collect(rows, part):
+        results[rows], maxima[rows] = part
+        done[rows] = True
+        if path is not None:
+            save_sweep(path, results, maxima, done, options)
+
+    if workers == 1:
+        for rows in chunks:
+            collect(rows, evaluate(grid[rows], **options))
+    elif chunks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(evaluate, grid[rows], **options): rows for rows in chunks}
+            for future in as_completed(futures):
+                collect(futures[future], future.result())
+    return results, maxima
+
+
+def format_table(results, rows=20):
+    # Compact text table, thinned to about `rows` lines
+    columns = ["A", "B", "C", "lyapunov", "z_mean", "z_std", "z_min", "z_max", "n_maxima"]
+    lines = ["".join(f"{name:>11}" for name in columns)]
+    for row in results[::max(1, len(results) // rows)]:
+        lines.append("".join(f"{row[name]:>11d}" if name == "n_maxima" else f"{row[name]:>11.4g}"
+                             for name in columns))
+    return "\n".join(lines)
+
+
+def bifurcation_points(results, maxima, param="B"):
+    # (parameter value, z maximum) pairs for every recorded maximum
+    values = np.repeat(results[param], maxima.shape[1])
+    z = maxima.ravel()
+    keep = ~np.isnan(z)
+    return values[keep], z[keep]
+
+
+def plot_results(results, maxima, param="B", save=None):
+    plt = pyplot(save)
+    plt.figure(figsize=(10, 8))
+
+    plt.subplot(2, 1, 1)
+    p, z = bifurcation_points(results, maxima, param)
+    plt.plot(p, z, ',k', alpha=0.5)
+    plt.title(f'Bifurcation diagram: local maxima of z vs {param}')
+    plt.ylabel('z maxima')
+
+    plt.subplot(2, 1, 2)
+    plt.plot(results[param], results["lyapunov"], '.', markersize=2)
+    plt.axhline(0, color='gray', linewidth=0.5)
+    plt.xlabel(param)
+    plt.ylabel('Largest Lyapunov exponent')
+
+    plt.tight_layout()
+    if save:
+        plt.savefig(save)
+        plt.close()
+    else:
+        plt.show()
+
+
+def _values(text):
+    # Parameter values on the command line: a list "28,100" or "start:stop:count" for evenly spaced values
+    parts = text.split(":")
+    if len(parts) == 3:
+        return np.linspace(float(parts[0]), float(parts[1]), int(parts[2]))
+    return np.array(text.split(","), dtype=float)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lyapunov exponents and bifurcations of the Lorenz system.")
+    parser.add_argument("--A", type=_values, default=np.array([A]), help="values of A, 'a,b' or 'start:stop:count'")
+    parser.add_argument("--B", type=_values, default=np.linspace(0.5, 200, 400), help="values of B")
+    parser.add_argument("--C", type=_values, default=np.array([C]), help="values of C")
+    parser.add_argument("--dt", type=float, default=0.01, help="RK4 time step")
+    parser.add_argument("--t-transient", type=float, default=50.0, help="discarded time before measuring")
+    parser.add_argument("--t-measure", type=float, default=200.0, help="averaging time")
+    parser.add_argument("--max-maxima", type=int, default=64, help="z maxima stored per grid point")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="grid points integrated together")
+    parser.add_argument("--output", default="lorenz_sweep.npz", help="columnar results file (.npz)")
+    parser.add_argument("--param", choices=PARAMETERS, default="B", help="parameter on the diagram's x axis")
+    parser.add_argument("--no-plot", action="store_true", help="only run the sweep, do not render anything")
+    parser.add_argument("--save", metavar="PATH", help="write the figure to PATH instead of opening a window")
+    args = parser.parse_args(argv)
+
+    grid = build_grid(args.A, args.B, args.C)
+    results, maxima = run_sweep(grid, args.output, args.workers, args.chunk_size, dt=args.dt,
+                                t_transient=args.t_transient, t_measure=args.t_measure,
+                                max_maxima=args.max_maxima)
+    print(format_table(results))
+    print(f"{len(results)} parameter points stored in {args.output}")
+    if not args.no_plot:
+        plot_results(results, maxima, args.param, save=args.save)
+    return results, maxima
+
+
+if __name__ == "__main__":
+    main()
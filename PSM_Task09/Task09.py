@@ -1,17 +1,82 @@
-import turtle
+import argparse
 import math
+from functools import lru_cache
+from time import perf_counter
 
-def apply_rules(word):
+# L-system: axiom and production rules (symbols without a rule are copied unchanged)
+AXIOM = 'X'
+RULES = {
+    'X': 'F+[[X]-X]-F[-FX]+X',
+    'F': 'FF',
+}
+
+def _rule_items(rules):
+    # Hashable form of a rule table, used as cache key
+    return tuple(sorted(rules.items()))
+
+@lru_cache(maxsize=64)
+def _translation(rule_items):
+    return str.maketrans(dict(rule_items))
+
+def apply_rules(word, rules=RULES):
     """Apply the L-system rules to the current word."""
-    new_word = ""
-    for char in word:
-        if char == 'X':
-            new_word += 'F+[[X]-X]-F[-FX]+X'
-        elif char == 'F':
-            new_word += 'FF'
+    # str.translate rewrites every symbol in one pass in C, linear in the length of the result
+    return word.translate(_translation(_rule_items(rules)))
+
+# Expansions are memoized per single symbol: the word for X after d steps is the
+# concatenation of the (d - 1)-step words of the symbols of its rule, so every
+# level is one join of cached pieces instead of a pass over the whole word
+@lru_cache(maxsize=256)
+def _expand_symbol(symbol, rule_items, depth):
+    rules = dict(rule_items)
+    if depth == 0 or symbol not in rules:
+        return symbol
+    return ''.join([_expand_symbol(s, rule_items, depth - 1) for s in rules[symbol]])
+
+@lru_cache(maxsize=16)
+def _expand(axiom, rule_items, depth):
+    return ''.join([_expand_symbol(s, rule_items, depth) for s in axiom])
+
+def expand(axiom=AXIOM, rules=RULES, depth=5):
+    """The word after `depth` rewriting steps, memoized per (axiom, rules, depth)."""
+    return _expand(axiom, _rule_items(rules), depth)
+
+def iter_chunks(axiom=AXIOM, rules=RULES, depth=5, chunk_depth=6):
+    """Yield the expanded word depth-first in pieces, without building it.
+
+    A symbol that still has chunk_depth or fewer steps to go is yielded as
+    its (memoized) expansion; above that its rule is walked symbol by
+    symbol on an explicit stack. Memory is one stack entry per level plus
+    the cached expansions of the single symbols.
+    """
+    stack = [(iter(axiom), depth)]
+    while stack:
+        symbols, remaining = stack[-1]
+        for symbol in symbols:
+            if symbol in rules and remaining > chunk_depth:
+                stack.append((iter(rules[symbol]), remaining - 1))
+                break
+            yield expand(symbol, rules, remaining) if symbol in rules else symbol
         else:
-            new_word += char
-    return new_word
+            stack.pop()
+
+def iter_symbols(axiom=AXIOM, rules=RULES, depth=5, chunk_depth=6):
+    """Lazy version of expand: yields the symbols of the word one at a time."""
+    for chunk in iter_chunks(axiom, rules, depth, chunk_depth):
+        yield from chunk
+
+def word_length(axiom=AXIOM, rules=RULES, depth=5):
+    """Length of the expanded word, from symbol counts only."""
+    counts = {}
+    for symbol in axiom:
+        counts[symbol] = counts.get(symbol, 0) + 1
+    for _ in range(depth):
+        new_counts = {}
+        for symbol, count in counts.items():
+            for produced in rules.get(symbol, symbol):
+                new_counts[produced] = new_counts.get(produced, 0) + count
+        counts = new_counts
+    return sum(counts.values())
 
 def draw_plant(t, word, angle, length):
     """Draw the plant using turtle graphics."""
@@ -33,27 +98,49 @@ def draw_plant(t, word, angle, length):
             t.setheading(heading)
             t.pendown()
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw an L-system plant with turtle graphics.")
+    parser.add_argument("--iterations", type=int, default=5, help="number of rewriting steps")
+    parser.add_argument("--no-plot", action="store_true",
+                        help="only expand the word and report its length, do not draw")
+    parser.add_argument("--svg", metavar="PATH", help="write the plant to an SVG file instead of drawing it")
+    parser.add_argument("--png", metavar="PATH", help="write the plant to a PNG file instead of drawing it")
+    args = parser.parse_args(argv)
+
+    angle = 25
+    length = 5
+
+    if args.no_plot:
+        # Stream the word in chunks: memory stays bounded for any number of iterations
+        start = perf_counter()
+        total = sum(len(chunk) for chunk in iter_chunks(AXIOM, RULES, args.iterations))
+        print(f"{total} symbols after {args.iterations} iterations, "
+              f"expanded in {perf_counter() - start:.2f} s")
+        return total
+
+    if args.svg or args.png:
+        # Headless output through plant_geometry.py, no display needed
+        from plant_geometry import plant_segments, save_png, save_svg
+        segments = plant_segments(AXIOM, RULES, args.iterations, angle, length)
+        if args.svg:
+            save_svg(segments, args.svg)
+        if args.png:
+            save_png(segments, args.png)
+        return segments
+
+    # turtle needs Tk and a display, so it is only imported for drawing on screen
+    import turtle
+
     # Initialize turtle
     t = turtle.Turtle()
     t.speed(0)
     t.left(90)
-    
-    angle = 25
-    length = 5
-    iterations = 5  # Number of iterations
-    
-    # Initial word
-    word = 'X'
-    
-    for _ in range(iterations):
-        word = apply_rules(word)
-    
-    # Draw the plant
-    draw_plant(t, word, angle, length)
-    
+
+    # Draw the plant, reading the word lazily
+    draw_plant(t, iter_symbols(AXIOM, RULES, args.iterations), angle, length)
+
     t.hideturtle()
     turtle.done()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
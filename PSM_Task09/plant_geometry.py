@@ -0,0 +1,279 @@
+import argparse
+import io
+import struct
+import zlib
+from functools import lru_cache
+from time import perf_counter
+
+import numpy as np
+
+from Task09 import AXIOM, RULES, _rule_items
+
+# Headless replacement for the turtle of Task09: the word is turned into an
+# array of line segments (n, 2, 2) = (start, end) points with NumPy and
+# written as SVG or PNG without Tk. Commands are those of draw_plant:
+# F forward, + turn right, - turn left, [ push, ] pop; other symbols are
+# ignored. Headings are in degrees, 90 pointing up as after t.left(90).
+
+# Default drawing parameters, as in Task09.main
+ANGLE = 25
+LENGTH = 5
+HEADING = 90
+
+def _codes(word):
+    return np.frombuffer(word.encode('ascii'), dtype=np.uint8)
+
+def _check_brackets(word):
+    depth = 0
+    for symbol in word:
+        depth += (symbol == '[') - (symbol == ']')
+        if depth < 0:
+            break
+    if depth != 0:
+        raise ValueError(f"unbalanced brackets in {word!r}")
+
+def bracket_levels(codes):
+    """Nesting depth of every symbol and the matching bracket pairs.
+
+    depth counts the '[' opened up to and including a symbol minus the ']'
+    before it closed. pairs[level - 1] = (opens, closes) holds the
+    positions of the brackets of that level; both are sorted and
+    opens[k] matches closes[k].
+    """
+    is_open = codes == ord('[')
+    is_close = codes == ord(']')
+    depth = np.cumsum(is_open, dtype=np.int64) - np.cumsum(is_close, dtype=np.int64)
+    if depth.size and (depth.min() < 0 or depth[-1] != 0):
+        raise ValueError("unbalanced brackets in the word")
+    open_pos = np.flatnonzero(is_open)
+    close_pos = np.flatnonzero(is_close)
+    open_level = depth[open_pos]
+    close_level = depth[close_pos] + 1
+    pairs = []
+    for level in range(1, int(open_level.max(initial=0)) + 1):
+        pairs.append((open_pos[open_level == level], close_pos[close_level == level]))
+    return depth, pairs
+
+def bracket_cumsum(values, codes, depth, pairs):
+    """Cumulative sum of per-symbol values in which every ']' restores the sum at its '['.
+
+    Each value is undone at the ']' closing its innermost bracket pair; the
+    pairs nested inside undo their own values, so after a ']' everything
+    since the matching '[' is cancelled. One vectorized pass per level.
+    """
+    values = np.array(values, dtype=float)
+    is_bracket = (codes == ord('[')) | (codes == ord(']'))
+    for level, (opens, closes) in enumerate(pairs, start=1):
+        inside = np.flatnonzero((depth == level) & ~is_bracket)
+        owner = np.searchsorted(opens, inside) - 1
+        np.add.at(values, closes[owner], -values[inside])
+    return np.cumsum(values, axis=0)
+
+def interpret(word, angle=ANGLE, length=LENGTH, start=(0.0, 0.0), heading=HEADING):
+    """Segments drawn by Task09.draw_plant for `word`, as an (n, 2, 2) array."""
+    codes = _codes(word)
+    depth, pairs = bracket_levels(codes)
+    turns = np.where(codes == ord('+'), -angle, 0.0) + np.where(codes == ord('-'), angle, 0.0)
+    headings = heading + bracket_cumsum(turns, codes, depth, pairs)
+
+    forward = codes == ord('F')
+    theta = np.radians(headings[forward])
+    steps = np.zeros((len(codes), 2))
+    steps[forward, 0] = length * np.cos(theta)
+    steps[forward, 1] = length * np.sin(theta)
+    ends = np.asarray(start, dtype=float) + bracket_cumsum(steps, codes, depth, pairs)
+
+    segments = np.empty((len(theta), 2, 2))
+    segments[:, 1] = ends[forward]
+    segments[:, 0] = ends[forward] - steps[forward]
+    return segments
+
+# Instancing
+# Every occurrence of a symbol with the same number of steps to go draws the
+# same shape, only moved and turned. That shape is computed once per
+# (symbol, depth) in a local frame (origin, heading 0) from the shapes of the
+# symbols of its rule, and copied into place with one rotation per piece.
+def _place(segments, x, y, heading):
+    theta = np.radians(heading)
+    c, s = np.cos(theta), np.sin(theta)
+    return segments @ np.array([[c, s], [-s, c]]) + (x, y)
+
+def _walk(word, rule_items, depth, angle, length, x, y, heading):
+    # Run a short word (an axiom or a rule) symbol by symbol, placing the instances of its symbols
+    pieces = []
+    stack = []
+    for symbol in word:
+        if symbol == '[':
+            stack.append((x, y, heading))
+        elif symbol == ']':
+            x, y, heading = stack.pop()
+        else:
+            child, (cx, cy, turn) = _instance(symbol, rule_items, depth, angle, length)
+            if len(child):
+                pieces.append(_place(child, x, y, heading))
+            theta = np.radians(heading)
+            x, y = x + np.cos(theta) * cx - np.sin(theta) * cy, y + np.sin(theta) * cx + np.cos(theta) * cy
+            heading += turn
+    segments = np.concatenate(pieces) if pieces else np.zeros((0, 2, 2))
+    return segments, (x, y, heading)
+
+@lru_cache(maxsize=256)
+def _instance(symbol, rule_items, depth, angle, length):
+    """Segments of `symbol` expanded `depth` times in the local frame and the turtle's final (x, y, heading).
+
+    The cached arrays are shared and therefore read-only.
+    """
+    rules = dict(rule_items)
+    if depth == 0 or symbol not in rules:
+        if symbol == 'F':
+            segments, end = np.array([[[0.0, 0.0], [length, 0.0]]]), (float(length), 0.0, 0.0)
+        else:
+            turn = {'+': -angle, '-': angle}.get(symbol, 0.0)
+            segments, end = np.zeros((0, 2, 2)), (0.0, 0.0, float(turn))
+    else:
+        segments, end = _walk(rules[symbol], rule_items, depth - 1, angle, length, 0.0, 0.0, 0.0)
+    segments.flags.writeable = False
+    return segments, end
+
+def plant_segments(axiom=AXIOM, rules=RULES, depth=5, angle=ANGLE, length=LENGTH, start=(0.0, 0.0),
+                   heading=HEADING):
+    """Segments of the plant after `depth` iterations, same as interpret(expand(axiom, rules, depth)).
+
+    Built from instances memoized per (symbol, depth), so the full word is
+    never expanded or walked; axiom and rules must have balanced brackets.
+    """
+    for word in (axiom, *rules.values()):
+        _check_brackets(word)
+    segments, _ = _walk(axiom, _rule_items(rules), depth, angle, length, float(start[0]), float(start[1]),
+                        float(heading))
+    return segments
+
+def forest_segments(origins, headings=None, scales=None, axiom=AXIOM, rules=RULES, depth=5, angle=ANGLE,
+                    length=LENGTH):
+    """Copies of one plant moved to `origins` (P, 2), turned to `headings` and scaled; shape (P, n, 2, 2)."""
+    plant = plant_segments(axiom, rules, depth, angle, length, heading=0.0)
+    origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+    count = len(origins)
+    headings = np.broadcast_to(HEADING if headings is None else headings, (count,))
+    scales = np.broadcast_to(1.0 if scales is None else scales, (count,))
+    theta = np.radians(headings)
+    c, s = scales * np.cos(theta), scales * np.sin(theta)
+    rotation = np.stack([np.stack([c, -s], axis=1), np.stack([s, c], axis=1)], axis=1)
+    return np.einsum('pij,nkj->pnki', rotation, plant) + origins[:, np.newaxis, np.newaxis, :]
+
+# Output
+def _fit(segments, width, height, margin):
+    # Map world coordinates to pixels: scaled to fit with a margin, centred, y pointing down
+    points = segments.reshape(-1, 2)
+    low, high = points.min(axis=0), points.max(axis=0)
+    span = np.maximum(high - low, 1e-12)
+    scale = min((width - 2 * margin) / span[0], (height - 2 * margin) / span[1])
+    offset = (np.array([width, height]) - scale * span) / 2
+
+    def transform(p):
+        pixels = (p - low) * scale + offset
+        pixels[..., 1] = height - pixels[..., 1]
+        return pixels
+
+    return transform
+
+def to_svg(segments, size=(800, 800), margin=10, stroke='green', stroke_width=1):
+    """SVG document with all segments as a single path."""
+    segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+    width, height = size
+    data = io.StringIO()
+    if len(segments):
+        points = _fit(segments, width, height, margin)(segments)
+        np.savetxt(data, points.reshape(-1, 4), fmt='M%.2f %.2fL%.2f %.2f', newline=' ')
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">\n'
+            f'<rect width="100%" height="100%" fill="white"/>\n'
+            f'<path d="{data.getvalue().strip()}" stroke="{stroke}" stroke-width="{stroke_width}" '
+            f'fill="none" stroke-linecap="round"/>\n</svg>\n')
+
+def save_svg(segments, path, size=(800, 800), margin=10, stroke='green', stroke_width=1):
+    with open(path, 'w') as f:
+        f.write(to_svg(segments, size, margin, stroke, stroke_width))
+
+def rasterize(segments, size=(800, 800), margin=10, chunk=65536):
+    """Draw the segments into a (height, width) uint8 image, 255 on the lines.
+
+    Every segment is sampled once per pixel of its length; segments are
+    processed in chunks so memory does not grow with their number.
+    """
+    segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+    width, height = size
+    image = np.zeros((height, width), dtype=np.uint8)
+    if not len(segments):
+        return image
+    transform = _fit(segments, width, height, margin)
+    for i in range(0, len(segments), chunk):
+        pixels = transform(segments[i:i + chunk])
+        start, delta = pixels[:, 0], pixels[:, 1] - pixels[:, 0]
+        samples = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64) + 1
+        owner = np.repeat(np.arange(len(samples)), samples)
+        first = np.cumsum(samples) - samples
+        t = (np.arange(samples.sum()) - first[owner]) / np.maximum(samples - 1, 1)[owner]
+        points = np.rint(start[owner] + t[:, np.newaxis] * delta[owner]).astype(np.int64)
+        x = np.clip(points[:, 0], 0, width - 1)
+        y = np.clip(points[:, 1], 0, height - 1)
+        image[y, x] = 255
+    return image
+
+def write_png(path, image):
+    """Write a 2D uint8 array as an 8-bit grayscale PNG (zlib and struct only)."""
+    height, width = image.shape
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = image  # each row starts with filter type 0
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', header))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+def save_png(segments, path, size=(800, 800), margin=10):
+    # Dark lines on a white background
+    write_png(path, 255 - rasterize(segments, size, margin))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render L-system plants without a display.")
+    parser.add_argument("--iterations", type=int, default=5, help="number of rewriting steps")
+    parser.add_argument("--angle", type=float, default=ANGLE, help="turning angle in degrees")
+    parser.add_argument("--length", type=float, default=LENGTH, help="length of one F step")
+    parser.add_argument("--forest", type=int, default=1, metavar="N", help="number of plants, on a square grid")
+    parser.add_argument("--size", type=int, nargs=2, default=[800, 800], help="image width and height")
+    parser.add_argument("--svg", metavar="PATH", help="write an SVG image")
+    parser.add_argument("--png", metavar="PATH", help="write a PNG image")
+    parser.add_argument("--npy", metavar="PATH", help="save the segments as a NumPy array")
+    args = parser.parse_args(argv)
+
+    start = perf_counter()
+    if args.forest > 1:
+        plant = plant_segments(AXIOM, RULES, args.iterations, args.angle, args.length)
+        spacing = np.ptp(plant.reshape(-1, 2), axis=0).max()
+        columns = int(np.ceil(np.sqrt(args.forest)))
+        rng = np.random.default_rng(0)
+        origins = spacing * np.stack(np.divmod(np.arange(args.forest), columns)[::-1], axis=1)
+        segments = forest_segments(origins, HEADING + rng.uniform(-10, 10, args.forest),
+                                   rng.uniform(0.6, 1.0, args.forest), AXIOM, RULES, args.iterations,
+                                   args.angle, args.length)
+    else:
+        segments = plant_segments(AXIOM, RULES, args.iterations, args.angle, args.length)
+    segments = segments.reshape(-1, 2, 2)
+    print(f"{len(segments)} segments built in {perf_counter() - start:.2f} s")
+
+    if args.svg:
+        save_svg(segments, args.svg, tuple(args.size))
+    if args.png:
+        save_png(segments, args.png, tuple(args.size))
+    if args.npy:
+        np.save(args.npy, segments)
+    return segments
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import time
+
+import numpy as np
+
+from PSM10 import display_grid, get_rules_from_user
+
+# Bit-packed Game of Life for very large grids. Every row is stored as
+# 64-bit words, cell (r, c) being bit c % 64 of word c // 64, so a cell takes
+# one bit instead of the 8 bytes of create_grid. A generation counts the
+# eight neighbors of 64 cells at once with bitwise adders and applies the
+# rules with bitwise comparisons; boundaries are cyclic as in PSM10.
+
+WORD = 64
+ONE = np.uint64(1)
+
+# Counter planes: a neighbor count is kept in four bit planes (weights 1, 2, 4, 8)
+def _half_adder(a, b):
+    return a ^ b, a & b
+
+def _full_adder(a, b, c):
+    partial = a ^ b
+    return partial ^ c, (a & b) | (partial & c)
+
+def count_planes(rows_above, rows, rows_below):
+    # Bits of the neighbor count: the row above and below contribute three neighbors
+    # each (west, same column, east), the own row two
+    s1, c1 = _full_adder(*rows_above)
+    s2, c2 = _full_adder(*rows_below)
+    s3, c3 = _half_adder(*rows)
+    bit0, c4 = _full_adder(s1, s2, s3)
+    t, d = _full_adder(c1, c2, c3)
+    bit1, e = _half_adder(t, c4)
+    bit2, bit3 = _half_adder(d, e)
+    return bit0, bit1, bit2, bit3
+
+def rule_mask(planes, inverted, counts):
+    # Bitmask of the cells whose neighbor count is in `counts`; inverted holds ~plane for every plane
+    mask = np.zeros_like(planes[0])
+    for n in set(counts):
+        if 0 <= n <= 8:
+            eq = None
+            for bit, (plane, inverse) in enumerate(zip(planes, inverted)):
+                term = plane if n >> bit & 1 else inverse
+                eq = term if eq is None else eq & term
+            mask |= eq
+    return mask
+
+class PackedGrid:
+    """Game of Life grid with 64 cells per uint64 word.
+
+    words has shape (rows, ceil(cols / 64)); bits beyond the last column are
+    always zero. Only `band` rows (plus one on each side) are expanded into
+    temporary planes at a time, so a step needs little more memory than the
+    two packed grids.
+    """
+
+    def __init__(self, words, cols):
+        self.words = np.ascontiguousarray(words, dtype=np.uint64)
+        self.rows = self.words.shape[0]
+        self.cols = cols
+        self.last_bit = (cols - 1) % WORD
+        # Valid bits of the last word of each row
+        self.last_mask = np.uint64((1 << (self.last_bit + 1)) - 1)
+
+    @classmethod
+    def from_dense(cls, grid):
+        # Pack a 0/1 array: cells padded to whole words, packed little-endian and read as uint64
+        grid = np.asarray(grid)
+        rows, cols = grid.shape
+        n_words = -(-cols // WORD)
+        bits = np.zeros((rows, n_words * WORD), dtype=np.uint8)
+        bits[:, :cols] = grid != 0
+        packed = np.packbits(bits, axis=1, bitorder='little')
+        return cls(packed.view('<u8').astype(np.uint64), cols)
+
+    @classmethod
+    def random(cls, rows, cols, seed=None):
+        # Random live and dead cells with equal probability, like create_grid, drawn directly as words
+        rng = np.random.default_rng(seed)
+        words = rng.integers(0, np.iinfo(np.uint64).max, size=(rows, -(-cols // WORD)), dtype=np.uint64,
+                             endpoint=True)
+        grid = cls(words, cols)
+        grid.words[:, -1] &= grid.last_mask
+        return grid
+
+    def to_dense(self, dtype=int):
+        # Unpack to the representation of create_grid
+        bytes_ = self.words.astype('<u8').view(np.uint8)
+        return np.unpackbits(bytes_, axis=1, count=self.cols, bitorder='little').astype(dtype)
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+    def population(self):
+        # Number of alive cells
+        if hasattr(np, "bitwise_count"):
+            return int(np.bitwise_count(self.words).sum(dtype=np.int64))
+        # NumPy < 2.0 has no bitwise_count: look up the bits of every byte in a 256-entry table
+        table = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).sum(axis=1).astype(np.uint8)
+        return int(table[self.words.view(np.uint8)].sum(dtype=np.int64))
+
+    def _west_east(self, words):
+        # Rows shifted by one column: west[c] holds cell c - 1 and east[c] cell c + 1, wrapping around
+        west = words << ONE
+        west[:, 1:] |= words[:, :-1] >> np.uint64(WORD - 1)
+        west[:, 0] |= (words[:, -1] >> np.uint64(self.last_bit)) & ONE
+        west[:, -1] &= self.last_mask
+
+        east = words >> ONE
+        east[:, :-1] |= words[:, 1:] << np.uint64(WORD - 1)
+        east[:, -1] &= self.last_mask >> ONE
+        east[:, -1] |= (words[:, 0] & ONE) << np.uint64(self.last_bit)
+        return west, east
+
+    def step(self, survival_rules, birth_rules, band=None):
+        """Next generation under the given survival and birth rules, as a new PackedGrid."""
+        n_words = self.words.shape[1]
+        band = band or max(1, (1 << 16) // n_words)
+        new_words = np.empty_like(self.words)
+        for r0 in range(0, self.rows, band):
+            r1 = min(r0 + band, self.rows)
+            # Rows r0 - 1 .. r1 with cyclic wrapping; np.take repeats rows when the grid is very short
+            block = self.words.take(np.arange(r0 - 1, r1 + 1) % self.rows, axis=0)
+            west, east = self._west_east(block)
+            above = (west[:-2], block[:-2], east[:-2])
+            below = (west[2:], block[2:], east[2:])
+            planes = count_planes(above, (west[1:-1], east[1:-1]), below)
+
+            alive = block[1:-1]
+            inverted = [~plane for plane in planes]
+            survive = rule_mask(planes, inverted, survival_rules)
+            born = rule_mask(planes, inverted, birth_rules)
+            result = (alive & survive) | (~alive & born)
+            result[:, -1] &= self.last_mask
+            new_words[r0:r1] = result
+        return PackedGrid(new_words, self.cols)
+
+def _rule_list(text):
+    return [int(n) for n in text.split(",")] if text else []
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bit-packed Game of Life with custom rules.")
+    parser.add_argument("--rows", type=int, default=4096, help="grid rows")
+    parser.add_argument("--cols", type=int, default=4096, help="grid columns")
+    parser.add_argument("--generations", type=int, default=10, help="generations to run")
+    parser.add_argument("--survival", help="survival rules, e.g. 2,3 (asked for if omitted)")
+    parser.add_argument("--birth", help="birth rules, e.g. 3")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args(argv)
+
+    if args.survival is None or args.birth is None:
+        survival_rules, birth_rules = get_rules_from_user()
+    else:
+        survival_rules, birth_rules = _rule_list(args.survival), _rule_list(args.birth)
+
+    grid = PackedGrid.random(args.rows, args.cols, args.seed)
+    start = time.perf_counter()
+    for _ in range(args.generations):
+        grid = grid.step(survival_rules, birth_rules)
+    elapsed = time.perf_counter() - start
+    cells = args.rows * args.cols * args.generations
+    print(f"{args.rows}x{args.cols} grid ({grid.nbytes / 2**20:.1f} MB packed): {args.generations} generations "
+          f"in {elapsed:.2f} s, {cells / elapsed / 1e9:.2f} billion cell updates/s, "
+          f"{grid.population()} cells alive")
+    if args.rows * args.cols <= 2500:
+        display_grid(grid.to_dense())
+    return grid
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import json
+import os
+
+import numpy as np
+
+# Checkpoint/restart for the long-running simulations (Task05, Task06, Task08).
+# Installed with `pip install -e .` from the repository root (see pyproject.toml).
+#
+# A checkpoint .npz holds only what is needed to continue a run: the step
+# counter, the current integrator state, the run parameters (as JSON) and the
+# global NumPy RNG state. Results recorded at every step are kept in a
+# memory-mapped history file next to it and filled in place, so writing a
+# checkpoint costs the same early and late in a run.
+
+def save_checkpoint(path, step, state, params, history=None):
+    """Save the state of a run after `step` steps.
+
+    state maps names to arrays of the current state. history, the memmap of
+    open_history, is flushed first so that its rows on disk cover every step
+    the checkpoint claims. The .npz is written under a temporary name and
+    renamed, so a killed job never leaves a half-written checkpoint.
+    """
+    if history is not None:
+        history.flush()
+    rng = np.random.get_state(legacy=False)
+    rng_meta = {"bit_generator": rng["bit_generator"], "pos": int(rng["state"]["pos"]),
+                "has_gauss": int(rng["has_gauss"]), "gauss": float(rng["gauss"])}
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, step=step, params=json.dumps(params), rng_key=rng["state"]["key"],
+                 rng_meta=json.dumps(rng_meta), **state)
+    os.replace(tmp, path)
+
+def load_checkpoint(path, params=None):
+    # Returns (step, state) and restores the RNG; with params given, refuses checkpoints of a different run
+    with np.load(path) as data:
+        stored = json.loads(str(data["params"]))
+        if params is not None and stored != params:
+            raise ValueError(f"{path} belongs to a different run: {stored}")
+        rng_meta = json.loads(str(data["rng_meta"]))
+        np.random.set_state({
+            "bit_generator": rng_meta["bit_generator"],
+            "state": {"key": data["rng_key"], "pos": rng_meta["pos"]},
+            "has_gauss": rng_meta["has_gauss"], "gauss": rng_meta["gauss"],
+        })
+        reserved = {"step", "params", "rng_key", "rng_meta"}
+        state = {key: data[key] for key in data.files if key not in reserved}
+        return int(data["step"]), state
+
+def history_path(checkpoint):
+    # state.npz -> state_history.npy
+    return os.path.splitext(checkpoint)[0] + "_history.npy"
+
+def open_history(checkpoint, rows, fields, resume=False):
+    """Memory-mapped per-step results of a checkpointed run.
+
+    fields maps a name to the shape of one entry (() for a number). The
+    result is a structured (rows,) array stored in history_path(checkpoint),
+    and history[name] is a writable view of one column. With resume=True
+    the existing file is reopened and must have the same layout.
+    """
+    path = history_path(checkpoint)
+    dtype = np.dtype([(name, float, shape) for name, shape in fields.items()])
+    if not resume:
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(rows,))
+    if not os.path.exists(path):
+        raise ValueError(f"cannot resume from {checkpoint}: its history file {path} is missing")
+    history = np.lib.format.open_memmap(path, mode="r+")
+    if history.dtype != dtype or history.shape != (rows,):
+        raise ValueError(f"{path} holds {history.shape} rows of {history.dtype}, expected {rows} of {dtype}")
+    return history
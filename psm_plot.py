@@ -0,0 +1,10 @@
+# Plotting helper shared by the Python tasks. matplotlib is imported only when
+# a figure is drawn, so the simulations can be used without it.
+
+def pyplot(save=None):
+    """matplotlib.pyplot, with the non-interactive Agg backend when the figure goes to a file."""
+    import matplotlib
+    if save:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt